@@ -1,6 +1,11 @@
 # Imports
-import os, sys, time, zipfile, tempfile, shutil, subprocess, tomllib, tomli_w, ssl, certifi, json, requests, io
-from urllib.request import urlopen, Request
+import time
+STARTUP_TIME = time.perf_counter()
+import os, sys, shutil, tomllib, json, threading
+from collections import deque
+# Everything else (requests, certifi, tomli_w, zipfile, tempfile, subprocess, hashlib,
+# concurrent.futures, argparse...) is imported where it is used, so starting KSAMM or just
+# launching the game doesn't pay for loading the network, TLS and archive stack
 
 # Current directory for KSAMM
 if getattr(sys, 'frozen', False):
@@ -11,6 +16,14 @@ elif __file__:
 # Some kinda important variables
 CONFIG_FILE = os.path.join(SCRIPT_DIR + "\\config.toml")
 MOD_SETUP_FOLDER = os.path.join(SCRIPT_DIR, "ModSetup")
+DISABLED_FOLDER = "Disabled"  # sibling of Content/ in the game folder
+STAGING_FOLDER = ".ksamm_staging"  # installs are extracted here, then renamed into Content/
+BACKUP_FOLDER = ".ksamm_backup"  # the version each install replaced, for rollback
+MOD_INDEX_FILE = os.path.join(SCRIPT_DIR, "mod_index.json")
+MOD_INDEX_VERSION = 1
+RELEASE_CACHE_FILE = os.path.join(SCRIPT_DIR, "release_cache.json")
+DISCOVERY_CACHE_FILE = os.path.join(SCRIPT_DIR, "discovery_cache.json")
+ARTIFACT_CACHE_FOLDER = os.path.join(SCRIPT_DIR, "Cache", "Artifacts")
 KSAMM_FILE = "ksamm.toml"
 KSAMM_VERSION = "0.1.7"
 GITHUB_RELEASES_API = "https://api.github.com/repos/Awsomgamr999/KSA-Mod-Manager/releases/latest"
@@ -18,7 +31,57 @@ SPACEDOCK_DOWNLOAD = "https://spacedock.info/mod/4048/KSA%20Mod%20Manager%20(KSA
 mod_loader_candidates = ["StarMap.exe", "Ksaloader.exe"]
 STARMAP_DOWNLOAD = "https://api.github.com/repos/StarMapLoader/StarMap/releases/latest"
 
-ssl_context = ssl.create_default_context(cafile=certifi.where())
+# Settings live in the [settings] table of config.toml, anything missing falls back to these
+DEFAULT_SETTINGS = {
+    "InstallWorkers": 0,  # 0 = pick from the CPU count
+    "DownloadWorkers": 4,
+    "HttpTimeout": 30,
+    "HttpRetries": 3,
+    "ReleaseCacheTTL": 900,  # seconds a cached GitHub release is trusted without asking GitHub again
+    "OfflineMode": False,
+    "ArtifactCacheMaxMB": 2048,  # downloaded archives kept for reinstalls, oldest-used evicted first
+    "ActiveProfile": "",
+    "ParseProcesses": 0,  # processes for parsing big Content trees, 0 = CPU count, 1 = never use a pool
+}
+STARTUP_CHECK_DEADLINE = 5  # seconds the background update check gets before its answer is dropped
+
+# Path discovery: how deep to look under each search root and which folders are never worth entering
+DISCOVERY_MAX_DEPTH = 4
+DISCOVERY_SKIP_DIRS = {
+    "windows", "windowsapps", "windows defender", "windows defender advanced threat protection",
+    "windows kits", "windows mail", "windows media player", "windows nt", "windows photo viewer",
+    "windowspowershell", "windows sidebar", "common files", "internet explorer", "microsoft",
+    "microsoft office", "microsoft visual studio", "microsoft sdks", "microsoft sql server",
+    "microsoft.net", "reference assemblies", "dotnet", "modifiablewindowsapps", "msbuild",
+    "nvidia corporation", "amd", "intel", "package cache", "$recycle.bin",
+    "system volume information", "node_modules", "__pycache__", "site-packages",
+}
+PARSE_POOL_MIN_MODS = 600  # below this a process pool costs more to start than it saves, see benchmarks/bench_parse.py
+WATCH_SETTLE_SECONDS = 2  # a zip must stop changing for this long before watch mode installs it
+WATCH_POLL_SECONDS = 1
+SHARD_MIN_BYTES = 32 * 1024 * 1024  # archives bigger than this get their members split across workers
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Archives are checked from their central directory before anything is extracted
+ZIP_MAX_UNCOMPRESSED = 32 * 1024 ** 3
+ZIP_MAX_MEMBERS = 250000
+ZIP_MAX_RATIO = 200  # uncompressed/compressed, for the archive and for any member over 1 MB
+
+class Span:
+    """One timed phase, used as `with ledger.span("extract", zip=name):`. Extra details can go in .args."""
+
+    def __init__(self, ledger, name, args):
+        self.ledger = ledger
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ledger.end_span(self, time.perf_counter())
+        return False
 
 class Ledger:
 
@@ -30,48 +93,121 @@ class Ledger:
     YELLOW  = "\033[93m"
     BOLD    = "\033[1m"
 
-    def __init__(self, width=60):
+    def __init__(self, width=60, stream=None):
         self.width = width
         self.line = "─" * self.width
+        self.counters = {}
+        self.stream = stream  # None means sys.stdout, --json points this at stderr
+        self.span_totals = {}  # span name -> [calls, seconds]
+        self.trace = None      # list of finished spans while --cprofile is recording
+        self.lock = threading.Lock()
 
     def header(self, title: str):
-        print(self.CYAN + self.line)
-        print(f"{self.BOLD}{self.CYAN}  {title}{self.RESET}")
-        print(self.CYAN + self.line + self.RESET)
+        print(self.CYAN + self.line, file=self.stream)
+        print(f"{self.BOLD}{self.CYAN}  {title}{self.RESET}", file=self.stream)
+        print(self.CYAN + self.line + self.RESET, file=self.stream)
 
     def heading(self, title: str):
-        print(f"\n{self.BOLD}{self.YELLOW}{title}{self.RESET}")
+        print(f"\n{self.BOLD}{self.YELLOW}{title}{self.RESET}", file=self.stream)
 
     def block(self, entries: dict):
         if entries:
             max_len = max(len(str(k)) for k in entries.keys())
             for key, value in entries.items():
-                print(f"  {key:<{max_len}} : {value}")
+                print(f"  {key:<{max_len}} : {value}", file=self.stream)
         else:
-            print("  (none)")
+            print("  (none)", file=self.stream)
 
     def info(self, message: str):
-        print(f"{self.CYAN}  {message}{self.RESET}")
+        print(f"{self.CYAN}  {message}{self.RESET}", file=self.stream)
 
     def success(self, message: str):
-        print(f"{self.GREEN}  OK    : {message}{self.RESET}")
+        print(f"{self.GREEN}  OK    : {message}{self.RESET}", file=self.stream)
+
+    def warning(self, message: str):
+        print(f"{self.YELLOW}  WARN  : {message}{self.RESET}", file=self.stream)
 
     def error(self, message: str):
-        print(f"{self.RED}  ERROR : {message}{self.RESET}")
+        print(f"{self.RED}  ERROR : {message}{self.RESET}", file=self.stream)
+
+    def count(self, name: str, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def span(self, name: str, **args):
+        return Span(self, name, args)
+
+    def traced(self, name: str):
+        """Decorator form of span() for whole operations."""
+        import functools
+        def wrap(func):
+            @functools.wraps(func)
+            def run(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return run
+        return wrap
+
+    def end_span(self, span, end):
+        with self.lock:
+            totals = self.span_totals.setdefault(span.name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += end - span.start
+            if self.trace is not None:
+                self.trace.append((span.name, span.start, end, threading.get_ident(), span.args))
+
+    def report_spans(self):
+        if not self.span_totals and not self.counters:
+            return
+        self.heading("Timings")
+        self.block({name: f"{seconds:.3f}s over {calls} call(s)"
+                    for name, (calls, seconds) in sorted(self.span_totals.items(), key=lambda t: -t[1][1])})
+        self.block({name: f"{value / 1048576:.1f} MB" if name.startswith("bytes_") else value
+                    for name, value in sorted(self.counters.items())})
+
+    def write_trace(self, path: str):
+        """Write recorded spans and the final counters in Chrome trace format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events = [{"name": name, "cat": "ksamm", "ph": "X", "pid": pid, "tid": tid,
+                   "ts": (start - STARTUP_TIME) * 1e6, "dur": (end - start) * 1e6, "args": args}
+                  for name, start, end, tid, args in self.trace or []]
+        now = (time.perf_counter() - STARTUP_TIME) * 1e6
+        events += [{"name": name, "ph": "C", "pid": pid, "tid": 0, "ts": now, "args": {name: value}}
+                   for name, value in self.counters.items()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def progress(self, label: str, done: int, total=None):
+        if total:
+            print(f"\r{self.CYAN}  {label}: {done / 1048576:.1f}/{total / 1048576:.1f} MB ({done * 100 // total}%){self.RESET}", end="", flush=True, file=self.stream)
+        else:
+            print(f"\r{self.CYAN}  {label}: {done / 1048576:.1f} MB{self.RESET}", end="", flush=True, file=self.stream)
+
+    def progress_done(self):
+        print(file=self.stream)
+
+    def timing(self, label: str, seconds: float):
+        print(f"{self.CYAN}  TIME  : {label} ({seconds:.2f}s){self.RESET}", file=self.stream)
 
 ledger = Ledger()
 
 # ===================== Initialization =====================
-def initialize():
-    ledger.header(f"Kitten Space Agency Mod Manager {KSAMM_VERSION}")
-    ledger.info("Checking required folders and config files...")
+def create_default_files():
     if not os.path.exists(CONFIG_FILE):
         with open(CONFIG_FILE, "w") as f:
             f.write('[paths]\nManifestPath = ""\nGamePath = ""\nModLoaderPath = ""\nModLoaderVersion = ""\nDependencyAllowList = []')
     if not os.path.exists(MOD_SETUP_FOLDER):
         os.mkdir(MOD_SETUP_FOLDER)
+
+def initialize(offline=False):
+    ledger.header(f"Kitten Space Agency Mod Manager {KSAMM_VERSION}")
+    ledger.info("Checking required folders and config files...")
+    create_default_files()
     ledger.success("Initialization complete.")
-    startup_update_warn()
+    if offline or load_settings().get("OfflineMode"):
+        ledger.info("Offline mode, skipping the update check.")
+    else:
+        start_startup_update_check()
 
 # ===================== Path Management =====================
 def require_kitten_path(name, prompt, required_exes=None):
@@ -105,17 +241,40 @@ def save_paths(manifest_path, game_path, mod_loader_path, mod_loader_version, al
     mod_loader_path = mod_loader_path or old_mod_loader_path or ""
     mod_loader_version = mod_loader_version or old_mod_loader_version or ""
     allowlist = allowlist or old_dependency_allow_list or []
-    data = {"paths": {
+    data = existing_data
+    data["paths"] = {
         "ManifestPath": manifest_path or "",
         "GamePath": game_path or "",
         "ModLoaderPath": mod_loader_path or "",
         "ModLoaderVersion": mod_loader_version or "",
         "DependencyAllowList": allowlist or []
-    }}
+    }
+    import tomli_w
     with open(CONFIG_FILE, "wb") as f:
         tomli_w.dump(data, f)
     ledger.success("Paths saved!")
 
+def load_settings():
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(CONFIG_FILE, "rb") as f:
+            data = tomllib.load(f)
+        settings.update(data.get("settings", {}))
+    except (OSError, tomllib.TOMLDecodeError):
+        pass
+    return settings
+
+def worker_count(requested=None, setting="InstallWorkers"):
+    if not requested:
+        requested = load_settings().get(setting) or 0
+    try:
+        requested = int(requested)
+    except (TypeError, ValueError):
+        requested = 0
+    if requested <= 0:
+        requested = min(8, (os.cpu_count() or 1) + 2)
+    return requested
+
 def load_paths():
     if not os.path.exists(CONFIG_FILE):
         ledger.error("No paths saved yet.")
@@ -129,6 +288,77 @@ def load_paths():
         ledger.error(f"Error reading config: {e}")
         return None, None, None, None, []
     
+def discover_executables(roots, targets, max_depth=DISCOVERY_MAX_DEPTH, skip_dirs=DISCOVERY_SKIP_DIRS):
+    """
+    Breadth-first search of every root at once for the groups of file names in targets
+    ({"game": ["KSA.exe"], ...}). Returns {group: folder} for each group found, shallowest
+    match first, and stops as soon as every group has been found.
+    """
+    wanted = {name.lower(): group for group, names in targets.items() for name in names}
+    found = {}
+    queue = deque()
+    seen = set()
+    for root in roots:
+        if root and os.path.isdir(root):
+            key = os.path.normcase(os.path.abspath(root))
+            if key not in seen:
+                seen.add(key)
+                queue.append((root, 0))
+
+    while queue and len(found) < len(targets):
+        folder, depth = queue.popleft()
+        try:
+            with os.scandir(folder) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            name = entry.name.lower()
+            try:
+                if entry.is_file():
+                    group = wanted.get(name)
+                    if group and group not in found:
+                        found[group] = folder
+                elif depth < max_depth and entry.is_dir(follow_symlinks=False):
+                    if name in skip_dirs or name.startswith("."):
+                        continue
+                    key = os.path.normcase(entry.path)
+                    if key not in seen:
+                        seen.add(key)
+                        queue.append((entry.path, depth + 1))
+            except OSError:
+                continue
+    return found
+
+def load_discovery_cache():
+    try:
+        with open(DISCOVERY_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def discover_paths(roots, targets, max_depth=DISCOVERY_MAX_DEPTH):
+    cache = load_discovery_cache()
+    found = {}
+    # Last run's hits are checked directly, then their parents are searched before the wide roots
+    for group, names in targets.items():
+        folder = cache.get(group)
+        if folder and any(os.path.isfile(os.path.join(folder, name)) for name in names):
+            found[group] = folder
+    remaining = {group: names for group, names in targets.items() if group not in found}
+    if remaining:
+        hint_roots = [os.path.dirname(cache[group]) for group in remaining if cache.get(group)]
+        found.update(discover_executables(hint_roots + list(roots), remaining, max_depth))
+
+    if found and any(cache.get(group) != folder for group, folder in found.items()):
+        cache.update(found)
+        try:
+            atomic_write_bytes(DISCOVERY_CACHE_FILE, json.dumps(cache).encode("utf-8"))
+        except OSError as e:
+            ledger.error(f"Could not save discovery cache: {e}")
+    return found
+
 def find_paths():
     ledger.heading("Attempting to find paths.")
     user_docs = os.path.expanduser("~\\Documents")
@@ -176,20 +406,6 @@ def find_paths():
             ledger.success(f"Found game directory: {game_path}")
             break
 
-    if not game_path:
-        for root_dir in [program_files, program_files_x86]:
-            ledger.info(f"Game not found in common locations, searching under {root_dir}...")
-            for root, dirs, files in os.walk(root_dir):
-                if "KSA.exe" in files:
-                    game_path = root
-                    ledger.success(f"Found game directory: {game_path}")
-                    break
-            if game_path:
-                break
-
-    if not game_path:
-        ledger.error("KSA.exe not found.")
-
     for root in common_game_roots:
         for exe in mod_loader_candidates:
             candidate = os.path.join(root, exe)
@@ -200,16 +416,24 @@ def find_paths():
         if mod_loader_path:
             break
 
+    targets = {}
+    if not game_path:
+        targets["game"] = ["KSA.exe"]
     if not mod_loader_path:
-        for root_dir in [program_files, program_files_x86, desktop_dir, desktop_onedrive_dir, default_install_path]:
-            ledger.info(f"Mod loader not found in common locations, searching under {root_dir}...")
-            for root, dirs, files in os.walk(root_dir):
-                if any(exe in files for exe in mod_loader_candidates):
-                    mod_loader_path = root
-                    ledger.success(f"Found mod loader directory: {mod_loader_path}")
-                    break
-            if mod_loader_path:
-                break
+        targets["mod_loader"] = mod_loader_candidates
+    if targets:
+        search_roots = [program_files, program_files_x86, desktop_dir, desktop_onedrive_dir, default_install_path]
+        ledger.info(f"Not found in common locations, searching {', '.join(r for r in search_roots if os.path.isdir(r)) or 'nothing'}...")
+        found = discover_paths(search_roots, targets)
+        if found.get("game"):
+            game_path = found["game"]
+            ledger.success(f"Found game directory: {game_path}")
+        if found.get("mod_loader"):
+            mod_loader_path = found["mod_loader"]
+            ledger.success(f"Found mod loader directory: {mod_loader_path}")
+
+    if not game_path:
+        ledger.error("KSA.exe not found.")
 
     if mod_loader_path is None:
         choice = input("Mod loader (StarMap/Ksaloader) not found. Do you have it installed? (y/n): ").lower()
@@ -224,9 +448,7 @@ def find_paths():
                     ledger.info("Installing the latest version of StarMap...")
 
                     # Fetch GitHub release info
-                    response = requests.get(STARMAP_DOWNLOAD)
-                    response.raise_for_status()
-                    latest_release = response.json()
+                    latest_release = fetch_release(STARMAP_DOWNLOAD)
                     mod_loader_version = latest_release.get("tag_name")
 
                     # Find the .zip asset
@@ -238,14 +460,13 @@ def find_paths():
                     zip_url = zip_asset["browser_download_url"]
                     ledger.info(f"Downloading {zip_asset['name']}...")
 
-                    r = requests.get(zip_url)
-                    r.raise_for_status()
-                    z = zipfile.ZipFile(io.BytesIO(r.content))
-
+                    import zipfile
                     # Install path
                     install_path = os.path.join(os.getcwd(), "StarMap")
-                    os.makedirs(install_path, exist_ok=True)
-                    z.extractall(install_path)
+                    archive_path, _ = fetch_archive(zip_url, label=f"Downloading {zip_asset['name']}")
+                    with zipfile.ZipFile(archive_path) as z:
+                        os.makedirs(install_path, exist_ok=True)
+                        z.extractall(install_path)
                     ledger.info(f"StarMap installed to {install_path}")
 
                     # Configure StarMap JSON
@@ -274,24 +495,42 @@ def find_paths():
     return manifest_path, game_path, mod_loader_path, mod_loader_version, allowlist
 
 # ===================== Mod Management =====================
+def normalize_toml_bytes(raw):
+    text_data = raw.decode("utf-8-sig")
+    return text_data.replace('\r', '').replace('\ufeff', '')
+
+def atomic_write_bytes(file_path, data):
+    import tempfile
+    folder = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".ksamm-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def strip_bom_and_get_text(file_path, ledger):
     
     try:
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            text_data = f.read()
+        with open(file_path, "rb") as f:
+            raw = f.read()
 
-        text_data = text_data.replace('\r', '')     
-        
-        text_data = text_data.replace('\ufeff', '')
-        
-        text_data = text_data.strip() 
+        text_data = normalize_toml_bytes(raw)
 
-        if not text_data:
+        if not text_data.strip():
              ledger.warning(f"{file_path} resulted in empty content after stripping. Skipping rewrite.")
              return None
 
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(text_data)
+        # Only touch the file when there was actually a BOM or CRLF to remove
+        normalized = text_data.encode("utf-8")
+        if normalized != raw:
+            atomic_write_bytes(file_path, normalized)
+            ledger.count("toml_normalized")
         
         return text_data
 
@@ -325,143 +564,946 @@ def read_mod_name(file_path, ledger):
         ledger.error(f"An unexpected error occurred while processing TOML in {file_path}: {e}")
         return None
 
+# ===================== Mod Index =====================
+# mod_index.json lives next to config.toml and remembers what was parsed out of every
+# mod.toml / ksamm.toml, so a folder is only re-read when one of those files changes.
+def file_signature(file_path, old_signature=None):
+    import hashlib
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    if old_signature and old_signature[0] == st.st_mtime_ns and old_signature[1] == st.st_size:
+        return old_signature
+    with open(file_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return [st.st_mtime_ns, st.st_size, digest]
+
+def signature_changed(old_signature, new_signature):
+    if old_signature is None or new_signature is None:
+        return old_signature != new_signature
+    # mtime can move without the content changing (copies, restores), the hash decides
+    return old_signature[2] != new_signature[2]
+
+def read_ksamm_file(ksamm_toml):
+    record = {"dependencies": [], "optional_dependencies": [], "metadata": {}, "ksamm_error": None}
+    toml_text = strip_bom_and_get_text(ksamm_toml, ledger)
+    if toml_text is None:
+        record["ksamm_error"] = f"Failed to read/strip BOM from {ksamm_toml}."
+        return record
+    try:
+        data = tomllib.loads(toml_text)
+    except tomllib.TOMLDecodeError as e:
+        record["ksamm_error"] = f"TOML syntax error in {ksamm_toml}: {e}"
+        return record
 
-def rebuild_manifest(manifest_path, game_path):
+    for key in ("dependencies", "optional_dependencies"):
+        dep_list = data.get(key, [])
+        if not isinstance(dep_list, list):
+            continue
+        for dep in dep_list:
+            if isinstance(dep, dict):
+                dep_name = str(dep.get("name", "")).strip()
+                dep_link = str(dep.get("link", "")).strip()
+                if dep_name:
+                    record[key].append({"name": dep_name, "link": dep_link})
+    record["metadata"] = data.get("metadata", {})
+    return record
+
+def index_mod_folder(mod_dir, old_record=None):
+    old_record = old_record or {}
+    mod_toml = os.path.join(mod_dir, "mod.toml")
+    ksamm_toml = os.path.join(mod_dir, KSAMM_FILE)
+
+    record = {
+        "name": None,
+        "has_ksamm": False,
+        "dependencies": [],
+        "optional_dependencies": [],
+        "metadata": {},
+        "ksamm_error": None,
+    }
+    with ledger.span("parse", mod=os.path.basename(mod_dir)):
+        ledger.count("mods_parsed")
+        if os.path.exists(mod_toml):
+            record["name"] = read_mod_name(mod_toml, ledger)
+        if os.path.exists(ksamm_toml):
+            record["has_ksamm"] = True
+            try:
+                record.update(read_ksamm_file(ksamm_toml))
+            except Exception as e:
+                record["ksamm_error"] = f"Error processing file {ksamm_toml}: {e}"
+
+    # Signatures are taken after parsing, reading a file can normalise it on disk
+    record["mod_toml_sig"] = file_signature(mod_toml, old_record.get("mod_toml_sig"))
+    record["ksamm_toml_sig"] = file_signature(ksamm_toml, old_record.get("ksamm_toml_sig"))
+    return record
+
+def index_mod_chunk(jobs):
+    """
+    Process pool worker: index [(folder, mod_dir, old_record)], returns ([(folder, record)], TOML files normalised,
+    log output). A spawned worker's ledger would print to stdout, so its log is handed back for the parent to print.
+    """
+    import io
+    ledger.stream = io.StringIO()
+    before = ledger.counters.get("toml_normalized", 0)
+    records = [(folder, index_mod_folder(mod_dir, old_record)) for folder, mod_dir, old_record in jobs]
+    return records, ledger.counters.get("toml_normalized", 0) - before, ledger.stream.getvalue()
+
+def index_mod_folders(jobs, processes=None, min_mods=PARSE_POOL_MIN_MODS):
+    """Index [(folder, mod_dir, old_record)], split across a process pool when there are enough to pay for it."""
+    if processes is None:
+        processes = int(load_settings().get("ParseProcesses") or 0)
+    if processes <= 0:
+        processes = os.cpu_count() or 1
+    if processes <= 1 or len(jobs) < max(min_mods, 2):
+        return [(folder, index_mod_folder(mod_dir, old_record)) for folder, mod_dir, old_record in jobs]
+
+    from concurrent.futures import ProcessPoolExecutor
+    # A few chunks per process evens out folders that are slower to parse
+    size = -(-len(jobs) // (processes * 4))
+    chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+    results = []
+    try:
+        with ledger.span("parse-pool", mods=len(jobs), processes=processes), \
+                ProcessPoolExecutor(max_workers=processes) as pool:
+            for records, normalized, output in pool.map(index_mod_chunk, chunks):
+                if output:
+                    ledger.stream.write(output)
+                results.extend(records)
+                ledger.count("mods_parsed", len(records))
+                ledger.count("toml_normalized", normalized)
+    except (OSError, RuntimeError) as e:
+        ledger.warning(f"Parallel parsing failed ({e}), parsing serially.")
+        return [(folder, index_mod_folder(mod_dir, old_record)) for folder, mod_dir, old_record in jobs]
+    return results
+
+def load_mod_index(content_path):
+    try:
+        with open(MOD_INDEX_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MOD_INDEX_VERSION or data.get("content_path") != os.path.abspath(content_path):
+        return {}
+    mods = data.get("mods", {})
+    return mods if isinstance(mods, dict) else {}
+
+def save_mod_index(content_path, mods):
+    data = {"version": MOD_INDEX_VERSION, "content_path": os.path.abspath(content_path), "mods": mods}
+    try:
+        with ledger.span("index-write"), open(MOD_INDEX_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, default=str)
+    except OSError as e:
+        ledger.error(f"Could not save mod index: {e}")
+
+def record_is_current(mod_dir, record):
+    mod_sig = file_signature(os.path.join(mod_dir, "mod.toml"), record.get("mod_toml_sig"))
+    ksamm_sig = file_signature(os.path.join(mod_dir, KSAMM_FILE), record.get("ksamm_toml_sig"))
+    if signature_changed(record.get("mod_toml_sig"), mod_sig) or \
+       signature_changed(record.get("ksamm_toml_sig"), ksamm_sig):
+        return False, False
+    touched = mod_sig != record.get("mod_toml_sig") or ksamm_sig != record.get("ksamm_toml_sig")
+    record["mod_toml_sig"] = mod_sig
+    record["ksamm_toml_sig"] = ksamm_sig
+    return True, touched
+
+class ModCatalog:
+    """Everything KSAMM knows about Content/, built from a single scandir pass and the mod index."""
+
+    def __init__(self, content_path):
+        self.content_path = content_path
+        self.mods = {}
+        self.renames = {}  # old mod name (lower) -> new name, for folders whose mod.toml changed name
+        self.dirty = False
+        self.scan()
+
+    def reindex(self, folder, mod_dir, old_record, record=None):
+        record = record or index_mod_folder(mod_dir, old_record)
+        old_name = (old_record or {}).get("name")
+        if old_name and record.get("name") and old_name != record["name"]:
+            self.renames[old_name.lower()] = record["name"]
+        return record
+
+    def scan(self):
+        old_mods = load_mod_index(self.content_path)
+        mods = {}
+        changed = False
+        stale = []
+        with ledger.span("scan", content=self.content_path) as span, os.scandir(self.content_path) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    continue
+                old_record = old_mods.get(entry.name)
+                if old_record is not None:
+                    current, touched = record_is_current(entry.path, old_record)
+                    if current:
+                        mods[entry.name] = old_record
+                        changed = changed or touched
+                        continue
+                mods[entry.name] = None  # keeps scandir order, filled in below
+                stale.append((entry.name, entry.path, old_record))
+            span.args["mods"] = len(mods)
+            span.args["parsed"] = len(stale)
+
+        for folder, record in index_mod_folders(stale):
+            mods[folder] = self.reindex(folder, None, old_mods.get(folder), record)
+        changed = changed or bool(stale)
+
+        self.mods = mods
+        if changed or set(mods) != set(old_mods):
+            self.save()
+        return mods
+
+    def save(self):
+        save_mod_index(self.content_path, self.mods)
+        self.dirty = False
+
+    def add_folder(self, folder, save=True):
+        mod_dir = os.path.join(self.content_path, folder)
+        if not os.path.isdir(mod_dir):
+            return self.remove_folder(folder, save)
+        self.mods[folder] = self.reindex(folder, mod_dir, self.mods.get(folder))
+        self.dirty = True
+        if save:
+            self.save()
+        return self.mods[folder]
+
+    def remove_folder(self, folder, save=True):
+        record = self.mods.pop(folder, None)
+        self.dirty = True
+        if save:
+            self.save()
+        return record
+
+    def installed_names(self):
+        return {record["name"].lower(): folder for folder, record in self.mods.items() if record.get("name")}
+
+    def named_mods(self):
+        return [(folder, record["name"]) for folder, record in self.mods.items() if record.get("name")]
+
+    def ksamm_records(self):
+        return [(folder, record) for folder, record in self.mods.items() if record.get("has_ksamm")]
+
+def get_catalog(game_path, catalog=None):
     content_path = os.path.join(game_path, "Content")
-    manifest_file = manifest_path
+    if catalog is not None and os.path.abspath(catalog.content_path) == os.path.abspath(content_path):
+        return catalog
     if not os.path.isdir(content_path):
         ledger.error("No Content folder found.")
-        return
-    entries = []
-    core_entry = None
-    for folder in os.listdir(content_path):
-        mod_dir = os.path.join(content_path, folder)
-        mod_toml = os.path.join(mod_dir, "mod.toml")
-        if not os.path.exists(mod_toml):
+        return None
+    return ModCatalog(content_path)
+
+# ===================== Manifest =====================
+def read_manifest(manifest_path):
+    if not manifest_path or not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "rb") as f:
+            return tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        ledger.error(f"Could not read {manifest_path}, it will be rewritten: {e}")
+        return {}
+
+def write_manifest(manifest_path, document):
+    import tomli_w
+    with ledger.span("manifest-write"):
+        atomic_write_bytes(manifest_path, tomli_w.dumps(document).encode("utf-8"))
+
+def diff_manifest(entries, catalog):
+    """Apply what changed in Content/ to the existing [[mods]] entries, keeping their order and flags."""
+    wanted = {}
+    core_name = None
+    for folder, mod_name in catalog.named_mods():
+        wanted.setdefault(mod_name.lower(), mod_name)
+        if folder.lower() == "core":
+            core_name = mod_name
+
+    new_entries = []
+    present = set()
+    changes = {"added": [], "removed": [], "renamed": []}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("id"):
+            continue
+        key = str(entry["id"]).lower()
+        if key in present:
             continue
-        mod_name = read_mod_name(mod_toml, ledger)
-        if not mod_name:
+        if key not in wanted:
+            new_name = catalog.renames.get(key)
+            if new_name and new_name.lower() in wanted and new_name.lower() not in present:
+                changes["renamed"].append((entry["id"], new_name))
+                entry = dict(entry, id=new_name)
+                key = new_name.lower()
+            else:
+                changes["removed"].append(entry["id"])
+                continue
+        present.add(key)
+        new_entries.append(entry)
+
+    for key, mod_name in wanted.items():
+        if key in present:
             continue
+        changes["added"].append(mod_name)
         entry = {"id": mod_name, "enabled": True}
-        if folder.lower() == "core":
-            core_entry = entry
+        if mod_name == core_name:
+            new_entries.insert(0, entry)
         else:
-            entries.append(entry)
-    final_entries = [core_entry] if core_entry else []
-    final_entries.extend(entries)
-    with open(manifest_file, "wb") as f:
-        tomli_w.dump({"mods": final_entries}, f)
-    ledger.success("manifest.toml rebuilt.")
-
-def install_mods(manifest_path, game_path):
-    content_path = os.path.join(game_path, "Content")
-    os.makedirs(content_path, exist_ok=True)
-    if not os.path.exists(MOD_SETUP_FOLDER):
-        ledger.error("No ModSetup folder found.")
-        return
-    zips = [z for z in os.listdir(MOD_SETUP_FOLDER) if z.endswith(".zip")]
-    if not zips:
-        ledger.error("No .zip mods found in ModSetup folder.")
+            new_entries.append(entry)
+    return new_entries, changes
+
+@ledger.traced("rebuild-manifest")
+def rebuild_manifest(manifest_path, game_path, catalog=None):
+    manifest_file = manifest_path
+    catalog = get_catalog(game_path, catalog)
+    if catalog is None:
         return
-    for zip_file in zips:
-        zip_path = os.path.join(MOD_SETUP_FOLDER, zip_file)
+    document = read_manifest(manifest_file)
+    entries = document.get("mods", [])
+    if not isinstance(entries, list):
+        entries = []
+    final_entries, changes = diff_manifest(entries, catalog)
+    if os.path.exists(manifest_file) and "mods" in document and not any(changes.values()):
+        ledger.success("manifest.toml already up to date.")
+    else:
+        document["mods"] = final_entries
+        write_manifest(manifest_file, document)
+        ledger.success(f"manifest.toml updated ({len(changes['added'])} added, {len(changes['removed'])} removed, {len(changes['renamed'])} renamed).")
+    catalog.renames.clear()
+    normalized = ledger.counters.get("toml_normalized", 0)
+    if normalized:
+        ledger.info(f"TOML files normalised (BOM/CRLF) this run: {normalized}")
+    return changes
+
+def split_members(members, shard_count):
+    import heapq
+    # Largest files first onto whichever shard currently has the fewest bytes
+    shards = [(0, i, []) for i in range(shard_count)]
+    for info in sorted(members, key=lambda m: m.file_size, reverse=True):
+        size, i, shard = heapq.heappop(shards)
+        shard.append(info.filename)
+        heapq.heappush(shards, (size + info.file_size, i, shard))
+    return [shard for _, _, shard in shards if shard]
+
+def unsafe_member_name(name):
+    parts = name.replace("\\", "/").split("/")
+    return name.startswith(("/", "\\")) or ":" in parts[0] or ".." in parts
+
+def preflight_zip(infos, require_mod=True):
+    """
+    Check an archive using only its central directory (zipfile.infolist()), so bad ones are refused
+    before a byte is written. Returns a report whose "problems" list is empty when it is safe to extract.
+    """
+    files = [i for i in infos if not i.is_dir()]
+    uncompressed = sum(i.file_size for i in files)
+    compressed = sum(i.compress_size for i in files)
+    names = {i.filename.lower() for i in files}
+    top_level = sorted({i.filename.split("/")[0] for i in infos if "/" in i.filename})
+    report = {
+        "top_level": top_level,
+        "mod_folders": [folder for folder in top_level if f"{folder.lower()}/mod.toml" in names],
+        "files": len(files),
+        "uncompressed": uncompressed,
+        "ratio": uncompressed / compressed if compressed else 0.0,
+        "problems": [],
+    }
+    problems = report["problems"]
+
+    unsafe = [i.filename for i in infos if unsafe_member_name(i.filename)]
+    if unsafe:
+        problems.append(f"unsafe paths such as '{unsafe[0]}'")
+    if len(infos) > ZIP_MAX_MEMBERS:
+        problems.append(f"{len(infos)} entries (limit {ZIP_MAX_MEMBERS})")
+    if uncompressed > ZIP_MAX_UNCOMPRESSED:
+        problems.append(f"{uncompressed / 1024 ** 3:.1f} GB uncompressed (limit {ZIP_MAX_UNCOMPRESSED / 1024 ** 3:.0f} GB)")
+    bombs = [i.filename for i in files
+             if i.file_size > 1024 * 1024 and i.file_size > i.compress_size * ZIP_MAX_RATIO]
+    if report["ratio"] > ZIP_MAX_RATIO or bombs:
+        problems.append(f"compression ratio over {ZIP_MAX_RATIO}:1, likely a zip bomb")
+
+    if require_mod:
+        loose = [i.filename for i in files if "/" not in i.filename]
+        if loose:
+            problems.append(f"files outside a mod folder such as '{loose[0]}'")
+        elif not report["mod_folders"]:
+            found = sorted(i.filename for i in files if i.filename.lower().endswith("/mod.toml"))
+            hint = f", found {found[0]} instead" if found else ""
+            problems.append(f"no mod.toml in a top-level folder{hint}")
+    return report
+
+def plan_zip_extraction(zip_paths, workers):
+    import zipfile
+    claimed = {}
+    plans = []
+    for zip_path in zip_paths:
+        zip_file = os.path.basename(zip_path)
+        try:
+            with zipfile.ZipFile(zip_path, "r") as z:
+                infos = z.infolist()
+        except (OSError, zipfile.BadZipFile) as e:
+            ledger.error(f"Could not open {zip_file}: {e}")
+            continue
+
+        report = preflight_zip(infos)
+        if report["problems"]:
+            ledger.error(f"Skipping {zip_file}: {'; '.join(report['problems'])}.")
+            continue
+        for folder in report["top_level"]:
+            if folder not in report["mod_folders"]:
+                ledger.warning(f"{zip_file}: '{folder}' has no mod.toml, it will be installed anyway.")
+
+        # Whole top-level folders are swapped in, so two archives sharing one would replace each other.
+        # Content/ usually lives on a case-insensitive filesystem
+        conflicts = {folder: claimed[folder.lower()] for folder in report["top_level"]
+                     if claimed.get(folder.lower(), zip_file) != zip_file}
+        if conflicts:
+            ledger.error(f"Skipping {zip_file}, it installs folders another archive in this run also installs:")
+            ledger.block(conflicts)
+            continue
+        for folder in report["top_level"]:
+            claimed[folder.lower()] = zip_file
+
+        files = [i for i in infos if not i.is_dir()]
+
+        total = sum(i.file_size for i in files)
+        shard_count = workers if total >= SHARD_MIN_BYTES and len(files) > 1 else 1
+        plans.append({
+            "zip_path": zip_path,
+            "dirs": [i.filename for i in infos if i.is_dir()] + [os.path.dirname(i.filename) for i in files],
+            "shards": split_members(files, shard_count) if files else [[]],
+            "top_level": report["top_level"],
+        })
+    return plans
+
+def extract_members(zip_path, members, dest):
+    import zipfile
+    with ledger.span("extract", zip=os.path.basename(zip_path), files=len(members)) as span:
+        size = 0
         with zipfile.ZipFile(zip_path, "r") as z:
-            z.extractall(content_path)
+            for name in members:
+                z.extract(name, dest)
+                size += z.getinfo(name).file_size
+        span.args["bytes"] = size
+    ledger.count("files_extracted", len(members))
+    ledger.count("bytes_extracted", size)
+    return span.start, time.perf_counter()
+
+def staging_dir(content_path):
+    import tempfile
+    # Next to Content/ so moving a finished install in is a rename on the same volume
+    staging_root = os.path.join(os.path.dirname(content_path), STAGING_FOLDER)
+    while True:
+        os.makedirs(staging_root, exist_ok=True)
+        try:
+            return tempfile.mkdtemp(dir=staging_root)
+        except FileNotFoundError:
+            continue  # a parallel install's discard_staging removed the empty root in between
+
+def discard_staging(stage_dir):
+    shutil.rmtree(stage_dir, ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(stage_dir))
+    except OSError:
+        pass  # another install is still using it
+
+class InstallRun:
+    """
+    Shared by link installs that commit into Content/ from several threads in one run. Commits are serialised,
+    and an archive whose top-level folders another archive in the run already installed is refused, so the
+    backup of the original folder is never overwritten.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.claimed = {}       # lowercased top-level folder -> link that installed it
+        self.backed_up = set()  # passed to commit_staged
+
+    def commit(self, stage_dir, content_path, folders, owner):
+        with self.lock:
+            # Content/ usually lives on a case-insensitive filesystem
+            conflicts = {folder: self.claimed[folder.lower()] for folder in folders
+                         if self.claimed.get(folder.lower(), owner) != owner}
+            if conflicts:
+                ledger.error(f"Refusing {owner}, it installs folders another archive in this run already installed:")
+                ledger.block(conflicts)
+                return False
+            commit_staged(stage_dir, content_path, folders, self.backed_up)
+            for folder in folders:
+                self.claimed[folder.lower()] = owner
+            return True
+
+def commit_staged(stage_dir, content_path, folders, backed_up=None):
+    """Rename staged mod folders into Content/, moving what they replace to the backup folder. All or nothing.
+
+    backed_up collects the folders backed up so far in this run; replacing one of them again would
+    overwrite the only copy of the original, so that raises instead.
+    """
+    backup_root = os.path.join(os.path.dirname(content_path), BACKUP_FOLDER)
+    backed_up = set() if backed_up is None else backed_up
+    swapped = []
+    try:
+        for folder in folders:
+            target = os.path.join(content_path, folder)
+            backup = os.path.join(backup_root, folder)
+            had_old = os.path.exists(target)
+            if had_old and folder.lower() in backed_up:
+                raise FileExistsError(f"'{folder}' was already replaced earlier in this run, its backup would be overwritten")
+            if had_old:
+                os.makedirs(backup_root, exist_ok=True)
+                if os.path.exists(backup):
+                    shutil.rmtree(backup)
+                os.rename(target, backup)
+            swapped.append((folder, had_old))
+            os.rename(os.path.join(stage_dir, folder), target)
+    except OSError:
+        for folder, had_old in reversed(swapped):
+            target = os.path.join(content_path, folder)
+            if os.path.exists(target):
+                shutil.rmtree(target, ignore_errors=True)
+            if had_old:
+                os.rename(os.path.join(backup_root, folder), target)
+        raise
+    backed_up.update(folder.lower() for folder, had_old in swapped if had_old)
+
+def extract_zips_parallel(zip_paths, dest, workers=None):
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    workers = worker_count(workers)
+    total_start = time.perf_counter()
+    plans = plan_zip_extraction(zip_paths, workers)
+
+    # Each archive gets its own staging folder; create every directory up front so workers never race on makedirs
+    for plan in plans:
+        plan["stage"] = staging_dir(dest)
+        for folder in plan["dirs"]:
+            if folder:
+                os.makedirs(os.path.join(plan["stage"], folder), exist_ok=True)
+
+    results = {plan["zip_path"]: {"ok": True, "start": None, "end": None, "error": None,
+                                  "top_level": plan["top_level"]} for plan in plans}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for plan in plans:
+            for shard in plan["shards"]:
+                futures[pool.submit(extract_members, plan["zip_path"], shard, plan["stage"])] = plan["zip_path"]
+        for future in as_completed(futures):
+            result = results[futures[future]]
+            try:
+                start, end = future.result()
+            except Exception as e:
+                result["ok"] = False
+                result["error"] = e
+                continue
+            result["start"] = start if result["start"] is None else min(result["start"], start)
+            result["end"] = end if result["end"] is None else max(result["end"], end)
+
+    # Only archives that extracted completely become visible in Content/
+    backed_up = set()
+    for plan in plans:
+        result = results[plan["zip_path"]]
+        if result["ok"]:
+            try:
+                commit_staged(plan["stage"], dest, plan["top_level"], backed_up)
+            except OSError as e:
+                result["ok"] = False
+                result["error"] = e
+        discard_staging(plan["stage"])
+
+    for zip_path, result in results.items():
+        zip_file = os.path.basename(zip_path)
+        if result["ok"]:
             ledger.success(f"Installed {zip_file}")
-        os.remove(zip_path)
-    rebuild_manifest(manifest_path, game_path)
+            if result["start"] is not None:
+                ledger.timing(f"Extracted {zip_file}", result["end"] - result["start"])
+        else:
+            ledger.error(f"Failed to install {zip_file}: {result['error']}")
+    ledger.timing(f"Extracted {len(plans)} archive(s) with {workers} worker(s)", time.perf_counter() - total_start)
+    return results
 
-def manage_mods(manifest_path, game_path):
+@ledger.traced("install")
+def install_mods(manifest_path, game_path, catalog=None, workers=None, zip_paths=None, remove_archives=None):
+    """Install every zip in ModSetup (removing each one that installs), or just zip_paths if given."""
     content_path = os.path.join(game_path, "Content")
+    os.makedirs(content_path, exist_ok=True)
+    if remove_archives is None:
+        remove_archives = zip_paths is None
+    if zip_paths is None:
+        if not os.path.exists(MOD_SETUP_FOLDER):
+            ledger.error("No ModSetup folder found.")
+            return catalog, {}
+        zip_paths = [os.path.join(MOD_SETUP_FOLDER, z) for z in sorted(os.listdir(MOD_SETUP_FOLDER)) if z.endswith(".zip")]
+    if not zip_paths:
+        ledger.error("No .zip mods found in ModSetup folder.")
+        return catalog, {}
+    catalog = get_catalog(game_path, catalog)
+    results = extract_zips_parallel(zip_paths, content_path, workers)
+    for zip_path, result in results.items():
+        if not result["ok"]:
+            continue
+        for folder in result["top_level"]:
+            catalog.add_folder(folder, save=False)
+        if remove_archives:
+            os.remove(zip_path)
+    catalog.save()
+    rebuild_manifest(manifest_path, game_path, catalog)
+    return catalog, results
+
+def find_installed_mod(catalog, name_or_folder):
+    wanted = name_or_folder.lower()
+    for folder, mod_name in catalog.named_mods():
+        if folder.lower() == wanted or mod_name.lower() == wanted:
+            return folder, mod_name
+    return None, None
+
+def backup_path(catalog, folder):
+    return os.path.join(os.path.dirname(catalog.content_path), BACKUP_FOLDER, folder)
+
+def rollback_mod(catalog, folder):
+    """Swap a mod with the version its last install replaced. Running it again swaps them back."""
+    backup = backup_path(catalog, folder)
+    if not os.path.isdir(backup):
+        return False
+    target = os.path.join(catalog.content_path, folder)
+    stage = staging_dir(catalog.content_path)
+    current = os.path.join(stage, folder)
+    try:
+        had_current = os.path.exists(target)
+        if had_current:
+            os.rename(target, current)
+        try:
+            os.rename(backup, target)
+        except OSError:
+            if had_current:
+                os.rename(current, target)
+            raise
+        if had_current:
+            os.rename(current, backup)
+    finally:
+        discard_staging(stage)
+    catalog.add_folder(folder)
+    return True
+
+def remove_mod(catalog, folder):
+    shutil.rmtree(os.path.join(catalog.content_path, folder))
+    return catalog.remove_folder(folder)
+
+def set_manifest_flags(manifest_path, catalog, flags):
+    """Set enabled flags ({lower mod name: bool}) in manifest.toml, bringing it in line with Content/ in the same write."""
+    document = read_manifest(manifest_path)
+    entries = document.get("mods", [])
+    if not isinstance(entries, list):
+        entries = []
+    entries, changes = diff_manifest(entries, catalog)
+    catalog.renames.clear()
+    flipped = []
+    for entry in entries:
+        enabled = flags.get(str(entry["id"]).lower())
+        if enabled is not None and entry.get("enabled", True) != enabled:
+            entry["enabled"] = enabled
+            flipped.append(entry["id"])
+    if flipped or any(changes.values()) or "mods" not in document:
+        document["mods"] = entries
+        write_manifest(manifest_path, document)
+    return flipped
+
+def set_mods_enabled(manifest_path, catalog, mod_names, enabled):
+    return set_manifest_flags(manifest_path, catalog, {name.lower(): enabled for name in mod_names})
+
+def manifest_flags(manifest_path):
+    entries = read_manifest(manifest_path).get("mods", [])
+    if not isinstance(entries, list):
+        return {}
+    return {str(e["id"]).lower(): e.get("enabled", True) for e in entries if isinstance(e, dict) and e.get("id")}
+
+def parked_mods(game_path):
+    """Mods moved out of Content/ into the sibling Disabled/ folder, as [(folder, name)]."""
+    disabled_path = os.path.join(game_path, DISABLED_FOLDER)
+    if not os.path.isdir(disabled_path):
+        return []
+    mods = []
+    with os.scandir(disabled_path) as it:
+        for entry in it:
+            if entry.is_dir():
+                mods.append((entry.name, index_mod_folder(entry.path).get("name") or entry.name))
+    return sorted(mods, key=lambda m: m[1].lower())
+
+def park_mod(game_path, catalog, folder):
+    """Move a mod to Disabled/ with a single rename, so the game and StarMap never see it."""
+    disabled_path = os.path.join(game_path, DISABLED_FOLDER)
+    os.makedirs(disabled_path, exist_ok=True)
+    target = os.path.join(disabled_path, folder)
+    if os.path.exists(target):
+        raise FileExistsError(f"{target} already exists")
+    os.rename(os.path.join(catalog.content_path, folder), target)
+    return catalog.remove_folder(folder)
+
+def unpark_mod(game_path, catalog, folder):
+    target = os.path.join(catalog.content_path, folder)
+    if os.path.exists(target):
+        raise FileExistsError(f"{target} already exists")
+    os.rename(os.path.join(game_path, DISABLED_FOLDER, folder), target)
+    return catalog.add_folder(folder)
+
+def find_parked_mod(game_path, name_or_folder):
+    wanted = name_or_folder.lower()
+    for folder, mod_name in parked_mods(game_path):
+        if folder.lower() == wanted or mod_name.lower() == wanted:
+            return folder, mod_name
+    return None, None
+
+def manage_mods(manifest_path, game_path, catalog=None):
+    catalog = get_catalog(game_path, catalog)
+    if catalog is None:
+        return
     while True:
-        mods = [(folder, read_mod_name(os.path.join(content_path, folder, "mod.toml"), ledger))
-                for folder in os.listdir(content_path)
-                if folder.lower() != "core" and os.path.exists(os.path.join(content_path, folder, "mod.toml"))]
-        mods = [m for m in mods if m[1]]
+        flags = manifest_flags(manifest_path)
+        mods = [(folder, name, "enabled" if flags.get(name.lower(), True) else "disabled")
+                for folder, name in catalog.named_mods() if folder.lower() != "core"]
+        mods += [(folder, name, "moved to Disabled/") for folder, name in parked_mods(game_path)]
         if not mods:
             ledger.error("No installed mods found.")
             return
         ledger.heading("Installed Mods")
-        ledger.block({str(i+1): f"{m[1]} ({m[0]})" for i, m in enumerate(mods)})
-        choice = input("Enter number to delete, or 'q' to quit: ")
+        ledger.block({str(i+1): f"{m[1]} ({m[0]}) [{m[2]}]" for i, m in enumerate(mods)})
+        choice = input("Enter number to select, or 'q' to quit: ")
         if choice.lower() == "q":
             return
         if not choice.isdigit() or not (1 <= int(choice) <= len(mods)):
             ledger.error("Invalid choice.")
             continue
-        idx = int(choice)-1
-        folder, mod_name = mods[idx]
-        shutil.rmtree(os.path.join(content_path, folder))
-        ledger.success(f"Deleted {mod_name}")
-        rebuild_manifest(manifest_path, game_path)
+        folder, mod_name, state = mods[int(choice)-1]
+        if state == "moved to Disabled/":
+            print("1. Move back to Content/ and enable")
+            action = input("Choose option (or anything else to cancel): ")
+            if action == "1":
+                unpark_mod(game_path, catalog, folder)
+                set_mods_enabled(manifest_path, catalog, [mod_name], True)
+                ledger.success(f"Enabled {mod_name}")
+            continue
+
+        print("1. Enable" if state == "disabled" else "1. Disable")
+        print("2. Move to Disabled/ (hidden from the game entirely)")
+        print("3. Delete")
+        has_backup = os.path.isdir(backup_path(catalog, folder))
+        if has_backup:
+            print("4. Roll back to the previously installed version")
+        action = input("Choose option (or anything else to cancel): ")
+        if action == "1":
+            enabled = state == "disabled"
+            set_mods_enabled(manifest_path, catalog, [mod_name], enabled)
+            ledger.success(f"{'Enabled' if enabled else 'Disabled'} {mod_name}")
+        elif action == "2":
+            try:
+                park_mod(game_path, catalog, folder)
+            except OSError as e:
+                ledger.error(f"Could not move {mod_name}: {e}")
+                continue
+            ledger.success(f"Moved {mod_name} to Disabled/")
+            rebuild_manifest(manifest_path, game_path, catalog)
+        elif action == "3":
+            remove_mod(catalog, folder)
+            ledger.success(f"Deleted {mod_name}")
+            rebuild_manifest(manifest_path, game_path, catalog)
+        elif action == "4" and has_backup:
+            try:
+                rollback_mod(catalog, folder)
+            except OSError as e:
+                ledger.error(f"Could not roll back {mod_name}: {e}")
+                continue
+            ledger.success(f"Rolled back {folder}")
+            rebuild_manifest(manifest_path, game_path, catalog)
+
+# ===================== Watch Mode =====================
+class InotifyWatcher:
+    """Names of files finished in a folder (written and closed, or moved in), from Linux inotify through ctypes."""
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+
+    def __init__(self, folder):
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), self.IN_CLOSE_WRITE | self.IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout):
+        import select, struct
+        names = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return names
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + 16 <= len(data):
+            _, _, _, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+            offset += 16 + length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Same interface as InotifyWatcher, by comparing folder listings. Used where inotify is not available."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.seen = self.snapshot()
+
+    def snapshot(self):
+        files = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.is_file():
+                    st = entry.stat()
+                    files[entry.name] = (st.st_size, st.st_mtime_ns)
+        return files
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        current = self.snapshot()
+        changed = {name for name, sig in current.items() if self.seen.get(name) != sig}
+        self.seen = current
+        return changed
+
+    def close(self):
+        pass
+
+def make_watcher(folder):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as e:
+            ledger.warning(f"inotify unavailable ({e}), polling {folder} instead.")
+    return PollingWatcher(folder)
+
+def settled_archives(pending, failed, settle):
+    """Pop and return the pending zips whose size and mtime have not changed for settle seconds."""
+    now = time.monotonic()
+    ready = []
+    for name, last in list(pending.items()):
+        try:
+            st = os.stat(os.path.join(MOD_SETUP_FOLDER, name))
+        except FileNotFoundError:
+            del pending[name]
+            continue
+        signature = (st.st_size, st.st_mtime_ns)
+        if failed.get(name) == signature:
+            del pending[name]  # already failed in this exact state, wait for it to change
+        elif last is None or last[0] != signature:
+            pending[name] = (signature, now)
+        elif now - last[1] >= settle:
+            del pending[name]
+            ready.append((name, signature))
+    return ready
+
+def watch_mod_setup(manifest_path, game_path, catalog=None, settle=WATCH_SETTLE_SECONDS, poll=WATCH_POLL_SECONDS, stop=None):
+    """
+    Install zips as they land in ModSetup until Ctrl+C (or stop is set). The catalog is built once and
+    updated per install, so Content/ is never rescanned. Returns {zip name: installed}.
+    """
+    import zipfile
+    catalog = get_catalog(game_path, catalog)
+    if catalog is None:
+        return {}
+    os.makedirs(MOD_SETUP_FOLDER, exist_ok=True)
+    watcher = make_watcher(MOD_SETUP_FOLDER)
+    pending = {name: None for name in os.listdir(MOD_SETUP_FOLDER) if name.lower().endswith(".zip")}
+    failed = {}
+    outcomes = {}
+    ledger.info(f"Watching {MOD_SETUP_FOLDER} for new mods ({type(watcher).__name__}). Press Ctrl+C to stop.")
+    try:
+        while not (stop and stop.is_set()):
+            for name in watcher.wait(min(settle, poll) if pending else poll):
+                if name.lower().endswith(".zip"):
+                    pending[name] = None
+            ready = settled_archives(pending, failed, settle)
+            if not ready:
+                continue
+            paths = {}
+            for name, signature in ready:
+                path = os.path.join(MOD_SETUP_FOLDER, name)
+                if zipfile.is_zipfile(path):
+                    paths[path] = (name, signature)
+                else:
+                    ledger.error(f"{name} is not a valid zip, it will be retried if it changes.")
+                    failed[name] = signature
+                    outcomes[name] = False
+            if not paths:
+                continue
+            try:
+                catalog, results = install_mods(manifest_path, game_path, catalog, zip_paths=list(paths), remove_archives=True)
+            except Exception as e:
+                # One bad batch must not end the watch; its archives are retried once they change
+                ledger.error(f"Installing {', '.join(name for name, _ in paths.values())} failed: {e}")
+                for name, signature in paths.values():
+                    failed[name] = signature
+                    outcomes[name] = False
+                continue
+            for path, (name, signature) in paths.items():
+                ok = results.get(path, {}).get("ok", False)
+                outcomes[name] = ok
+                if not ok:
+                    failed[name] = signature
+            missing = DependencyGraph.from_catalog(catalog).missing()
+            for entry in missing.values():
+                if entry["required"]:
+                    ledger.warning(f"'{entry['name']}' (needed by {', '.join(entry['needed_by'])}) is not installed.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    ledger.success(f"Stopped watching, {sum(outcomes.values())} archive(s) installed.")
+    return outcomes
 
 # ===================== Metadata =====================
 
-def check_for_metadata(manifest, game_path, allowlist, mode="metadata"):
+@ledger.traced("metadata")
+def check_for_metadata(manifest, game_path, allowlist, mode="metadata", catalog=None):
     content_path = os.path.join(game_path, "Content")
-    if not os.path.isdir(content_path):
-        ledger.error("No Content folder found.")
+    catalog = get_catalog(game_path, catalog)
+    if catalog is None:
         return
 
-    mod_folders = [f for f in os.listdir(content_path) if os.path.isdir(os.path.join(content_path, f))]
-    installed_mods = {}
-    
-    for f in mod_folders:
-        mod_toml_path = os.path.join(content_path, f, "mod.toml")
-        if not os.path.exists(mod_toml_path):
-            continue
-        mod_name = read_mod_name(mod_toml_path, ledger)
-        if mod_name:
-            installed_mods[mod_name.lower()] = f
+    installed_mods = catalog.installed_names()
 
     any_missing = False
     
-    for folder in mod_folders:
+    for folder, record in catalog.ksamm_records():
         ksamm_toml = os.path.join(content_path, folder, KSAMM_FILE)
-        if not os.path.exists(ksamm_toml):
+
+        if record.get("ksamm_error"):
+            ledger.error(f"{record['ksamm_error']} Skipping.")
             continue
-            
-        toml_text = None
-        data = None
 
         try:
-            toml_text = strip_bom_and_get_text(ksamm_toml, ledger)
-            
-            if toml_text is None:
-                ledger.error(f"Failed to read/strip BOM from {ksamm_toml}. Skipping.")
-                continue
-            
-            try:
-                data = tomllib.loads(toml_text)
-            except tomllib.TOMLDecodeError as e:
-                ledger.error(f"TOML syntax error in {ksamm_toml}: {e}")
-                continue 
             missing_required = {}
             missing_optional = {}
             for key in ("dependencies", "optional_dependencies"):
-                dep_list = data.get(key, [])
-                if isinstance(dep_list, list):
-                    for dep in dep_list:
-                        if isinstance(dep, dict):
-                            dep_name = dep.get("name", "").strip()
-                            dep_link = dep.get("link", "").strip()
-                            if dep_name and mode == "dependencies":
-                                if dep_name.lower() not in installed_mods:
-                                    ledger.info(f"Missing dependency detected: {dep_name} ({key})")
-                                    if key == "dependencies":
-                                        missing_required[dep_name] = dep_link
-                                    else:
-                                        missing_optional[dep_name] = dep_link
+                for dep in record.get(key, []):
+                    dep_name = dep["name"]
+                    dep_link = dep["link"]
+                    if mode == "dependencies":
+                        if dep_name.lower() not in installed_mods:
+                            ledger.info(f"Missing dependency detected: {dep_name} ({key})")
+                            if key == "dependencies":
+                                missing_required[dep_name] = dep_link
+                            else:
+                                missing_optional[dep_name] = dep_link
 
             if mode == "dependencies" and (missing_required or missing_optional):
                 any_missing = True
                 ledger.heading(f"Missing dependencies for {folder}")
                 ledger.block({"Required": list(missing_required.keys()), "Optional": list(missing_optional.keys())})
-                install_dependencies(game_path, manifest, allowlist)
 
             if mode == "metadata":
                 
-                raw_meta = data.get("metadata", {})
+                raw_meta = record.get("metadata", {})
                 
                 if not isinstance(raw_meta, dict):
                     ledger.error(
@@ -479,104 +1521,751 @@ def check_for_metadata(manifest, game_path, allowlist, mode="metadata"):
                 
                 ledger.heading(f"Metadata for {folder}")
                 ledger.block(meta_to_display)
-                
-        except UnicodeDecodeError as e:
-            ledger.error(f"Character encoding error in {ksamm_toml}: {e}")
-            continue
             
         except Exception as e:
             ledger.error(f"Error processing file {ksamm_toml}: {e}")
             continue
             
-    if mode == "dependencies" and not any_missing:
-        ledger.success("No missing dependencies found.")
+    if mode == "dependencies":
+        if any_missing:
+            install_dependencies(game_path, manifest, allowlist, catalog)
+        else:
+            ledger.success("No missing dependencies found.")
+
+
+# ===================== Dependency Graph =====================
+class DependencyGraph:
+    """Mods and the ksamm.toml edges between them, keyed by lower-case mod name."""
+
+    def __init__(self):
+        self.providers = {}       # mod -> folders that provide it
+        self.display = {}         # mod -> name as written
+        self.edges = {}           # mod -> {dependency: required}
+        self.dependents = {}      # dependency -> folders that asked for it
+        self.links = {}           # dependency -> first link seen
+        self.link_conflicts = {}  # dependency -> every different link seen
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        graph = cls()
+        for folder, record in catalog.mods.items():
+            graph.add_mod(folder, record)
+        return graph
+
+    def add_mod(self, folder, record):
+        name = record.get("name")
+        key = (name or folder).lower()
+        if name:
+            folders = self.providers.setdefault(key, [])
+            if folder not in folders:
+                folders.append(folder)
+            self.display.setdefault(key, name)
+        deps = self.edges.setdefault(key, {})
+        for dep_list, required in [("dependencies", True), ("optional_dependencies", False)]:
+            for dep in record.get(dep_list, []):
+                dep_key = dep["name"].lower()
+                deps[dep_key] = deps.get(dep_key, False) or required
+                self.display.setdefault(dep_key, dep["name"])
+                self.dependents.setdefault(dep_key, [])
+                if folder not in self.dependents[dep_key]:
+                    self.dependents[dep_key].append(folder)
+                link = dep.get("link")
+                if link:
+                    if dep_key not in self.links:
+                        self.links[dep_key] = link
+                    elif self.links[dep_key] != link:
+                        self.link_conflicts.setdefault(dep_key, {self.links[dep_key]}).add(link)
+
+    def nodes(self):
+        seen = dict.fromkeys(self.edges)
+        for deps in self.edges.values():
+            seen.update(dict.fromkeys(deps))
+        return list(seen)
+
+    def duplicates(self):
+        return {self.display[key]: folders for key, folders in self.providers.items() if len(folders) > 1}
+
+    def missing(self):
+        # A missing mod is required if any required-only path reaches it from an installed mod
+        required = set()
+        queue = deque(key for key in self.edges if key in self.providers)
+        visited = set(queue)
+        while queue:
+            key = queue.popleft()
+            for dep_key, is_required in self.edges.get(key, {}).items():
+                if is_required and dep_key not in required:
+                    required.add(dep_key)
+                    if dep_key not in visited:
+                        visited.add(dep_key)
+                        queue.append(dep_key)
+
+        missing = {}
+        for key in self.topological_order()[0]:
+            if key in self.providers or key not in self.dependents:
+                continue
+            missing[key] = {
+                "name": self.display[key],
+                "link": self.links.get(key, ""),
+                "required": key in required,
+                "needed_by": list(self.dependents[key]),
+            }
+        return missing
+
+    def topological_order(self):
+        """Kahn's algorithm, dependencies before the mods that need them. Returns (order, cycles)."""
+        nodes = self.nodes()
+        indegree = {key: 0 for key in nodes}
+        needed_by = {key: [] for key in nodes}
+        for key, deps in self.edges.items():
+            for dep_key in deps:
+                indegree[key] += 1
+                needed_by[dep_key].append(key)
+
+        queue = deque(key for key in nodes if indegree[key] == 0)
+        order = []
+        while queue:
+            key = queue.popleft()
+            order.append(key)
+            for dependent in needed_by[key]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    queue.append(dependent)
+
+        return order, self.find_cycles({key for key in nodes if indegree[key] > 0})
+
+    def find_cycles(self, remaining):
+        # Every node Kahn could not place still has an unplaced dependency, so walking
+        # those edges from any of them must loop back on itself
+        cycles = []
+        done = set()
+        for start in remaining:
+            if start in done:
+                continue
+            path = []
+            position = {}
+            key = start
+            while key not in done and key not in position:
+                position[key] = len(path)
+                path.append(key)
+                key = next(dep for dep in self.edges[key] if dep in remaining)
+            if key in position:
+                cycles.append([self.display[k] for k in path[position[key]:]])
+            done.update(path)
+        return cycles
+
+    def plan(self):
+        order, cycles = self.topological_order()
+        return {
+            "order": [self.display[key] for key in order],
+            "missing": list(self.missing().values()),
+            "cycles": cycles,
+            "duplicates": self.duplicates(),
+            "link_conflicts": {self.display[key]: sorted(links) for key, links in self.link_conflicts.items()},
+        }
+
+def report_dependency_plan(plan, show_order=False):
+    for cycle in plan["cycles"]:
+        ledger.warning(f"Dependency cycle: {' -> '.join(cycle + cycle[:1])}")
+    for name, folders in plan["duplicates"].items():
+        ledger.warning(f"'{name}' is provided by more than one folder: {', '.join(folders)}")
+    for name, links in plan["link_conflicts"].items():
+        ledger.warning(f"'{name}' is listed with different links: {', '.join(links)}")
+    if show_order:
+        ledger.heading("Resolved load order")
+        ledger.block({str(i+1): name for i, name in enumerate(plan["order"])})
+        ledger.heading("Missing dependencies")
+        ledger.block({m["name"]: f"{'required' if m['required'] else 'optional'}, needed by {', '.join(m['needed_by'])}, {m['link'] or 'no link'}"
+                      for m in plan["missing"]})
 
 
 # ===================== User Side Install Logic =====================
-def install_dependencies(game_path, manifest_path, allowlist):
-    content_path = os.path.join(game_path, "Content")
-    if not os.path.isdir(content_path):
-        ledger.error("No Content folder found.")
-        return
-
-    mod_folders = [f for f in os.listdir(content_path) if os.path.isdir(os.path.join(content_path, f))]
-    installed_mods = {}
-    for f in mod_folders:
-        mod_toml_path = os.path.join(content_path, f, "mod.toml")
-        if not os.path.exists(mod_toml_path):
+def ask_user(question, kind=None):
+    return input(f"{question} (y/n): ").lower() == "y"
+
+def approve_dependencies(missing, allowlist, ask=ask_user):
+    approved = []
+    allowlist_changed = False
+    for entry in missing.values():
+        dep_name = entry["name"]
+        dep_link = entry["link"]
+        if not entry["required"]:
+            if not ask(f"Optional dependency '{dep_name}' (for {', '.join(entry['needed_by'])}) is missing. Install?", "optional"):
+                continue
+        if not dep_link:
+            ledger.error(f"Skipping installation of '{dep_name}', no link was given.")
             continue
-        mod_name = read_mod_name(mod_toml_path, ledger)
-        if mod_name:
-            installed_mods[mod_name.lower()] = f
+        if dep_link not in allowlist:
+            if not ask(f"Dependency '{dep_name}' URL '{dep_link}' is not in your allowlist. Add and install?", "allowlist"):
+                ledger.error(f"Skipping installation of '{dep_name}' due to allowlist.")
+                continue
+            allowlist.append(dep_link)
+            allowlist_changed = True
+        approved.append(entry)
+    if allowlist_changed:
+        save_paths(None, None, None, None, allowlist)
+    return approved
+
+def download_dependencies(approved, catalog, workers=None, refresh=False, install_run=None):
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    workers = worker_count(workers, "DownloadWorkers")
+    install_run = install_run or InstallRun()
+    # Several mods can name the same archive, fetch each link once
+    by_link = {}
+    for entry in approved:
+        by_link.setdefault(entry["link"], []).append(entry)
+
+    results = {}
+    show_progress = len(by_link) == 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(install_mod_from_link, link, catalog.content_path, show_progress, refresh, install_run): link
+                   for link in by_link}
+        for future in as_completed(futures):
+            link = futures[future]
+            folders = future.result() or []
+            installed_folder = folders[0] if folders else None
+            for entry in by_link[link]:
+                results[entry["name"]] = installed_folder
+                if installed_folder:
+                    ledger.success(f"Installed '{entry['name']}' into folder '{installed_folder}'")
+                else:
+                    ledger.error(f"Failed to install dependency '{entry['name']}' from {link}")
+            for folder in folders:
+                catalog.add_folder(folder, save=False)
+    catalog.save()
+    return results
+
+@ledger.traced("resolve-dependencies")
+def install_dependencies(game_path, manifest_path, allowlist, catalog=None, workers=None, dry_run=False, ask=ask_user, refresh=False):
+    catalog = get_catalog(game_path, catalog)
+    if catalog is None:
+        return {}
+
+    for folder, record in catalog.ksamm_records():
+        if record.get("ksamm_error"):
+            ledger.error(f"Error reading {os.path.join(catalog.content_path, folder, KSAMM_FILE)}: {record['ksamm_error']}")
+
+    graph = DependencyGraph.from_catalog(catalog)
+    plan = graph.plan()
+    report_dependency_plan(plan, show_order=dry_run)
+    if dry_run:
+        ledger.info("Dry run, nothing was installed. Dependencies of mods that are not downloaded yet are resolved during install.")
+        return plan
+
+    # Each wave can reveal new ksamm.toml files, keep going until nothing new is missing
+    results = {}
+    asked = set()
+    install_run = InstallRun()  # shared by every wave, so a later one can't replace what an earlier one backed up
+    while True:
+        missing = {key: entry for key, entry in graph.missing().items() if key not in asked}
+        if not missing:
+            break
+        asked.update(missing)
+        approved = approve_dependencies(missing, allowlist, ask)
+        if not approved:
+            break
+        ledger.heading(f"Installing {len(approved)} dependenc{'y' if len(approved) == 1 else 'ies'}...")
+        known = set(catalog.mods)
+        wave = download_dependencies(approved, catalog, workers, refresh, install_run)
+        results.update(wave)
+        # Archives with several mods add more folders than the ones named in wave
+        for folder in catalog.mods.keys() - known:
+            graph.add_mod(folder, catalog.mods[folder])
+        for name, folder in wave.items():
+            if not folder:
+                continue
+            graph.add_mod(folder, catalog.mods.get(folder, {}))
+            if name.lower() not in graph.providers:
+                ledger.warning(f"'{folder}' was installed for '{name}' but its mod.toml does not name it '{name}'.")
 
-    for folder in mod_folders:
-        ksamm_toml = os.path.join(content_path, folder, KSAMM_FILE)
-        if not os.path.exists(ksamm_toml):
-            continue
+    for cycle in graph.topological_order()[1]:
+        if cycle not in plan["cycles"]:
+            ledger.warning(f"Dependency cycle: {' -> '.join(cycle + cycle[:1])}")
 
-        try:
-            with open(ksamm_toml, "rb") as f:
-                data = tomllib.load(f)
+    rebuild_manifest(manifest_path, game_path, catalog)
+    ledger.success("Dependency installation complete and manifest updated.")
+    return results
 
-            for key, auto_install in [("dependencies", True), ("optional_dependencies", False)]:
-                dep_list = data.get(key, [])
-                if not isinstance(dep_list, list):
-                    continue
 
-                for dep in dep_list:
-                    if isinstance(dep, dict):
-                        dep_name = dep.get("name", "").strip()
-                        dep_link = dep.get("link", "").strip()
-                        if not dep_name or dep_name.lower() in installed_mods:
-                            continue
-
-                        if not auto_install:
-                            choice = input(f"Optional dependency '{dep_name}' is missing. Install? (y/n): ").lower()
-                            if choice != "y":
-                                continue
-
-                        ledger.heading(f"Installing dependency '{dep_name}' for {folder}...")
-                        if dep_link not in allowlist:
-                            choice = input(f"Dependency '{dep_name}' URL '{dep_link}' is not in your allowlist. Add and install? (y/n): ").lower()
-                            if choice != "y":
-                                ledger.error(f"Skipping installation of '{dep_name}' due to allowlist.")
-                                continue
-                            allowlist.append(dep_link)
-                            save_paths(None, None, None, None, allowlist)
-
-                        installed_folder = install_mod_from_link(dep_link, content_path)
-                        if installed_folder:
-                            installed_mods[dep_name.lower()] = installed_folder
-                            ledger.success(f"Installed '{dep_name}' into folder '{installed_folder}'")
-                        else:
-                            ledger.error(f"Failed to install dependency '{dep_name}' from {dep_link}")
+# ===================== Profiles =====================
+def load_profiles():
+    try:
+        with open(CONFIG_FILE, "rb") as f:
+            profiles = tomllib.load(f).get("profiles", {})
+    except (OSError, tomllib.TOMLDecodeError):
+        return {}
+    return profiles if isinstance(profiles, dict) else {}
 
+def save_profiles(profiles, active=None):
+    import tomli_w
+    try:
+        with open(CONFIG_FILE, "rb") as f:
+            data = tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError):
+        data = {}
+    data["profiles"] = profiles
+    if active is not None:
+        data.setdefault("settings", {})["ActiveProfile"] = active
+    atomic_write_bytes(CONFIG_FILE, tomli_w.dumps(data).encode("utf-8"))
+
+def save_profile(name, manifest_path, game_path, catalog=None):
+    """Store the mods currently enabled in manifest.toml as a profile, with any download links KSAMM knows for them."""
+    catalog = get_catalog(game_path, catalog)
+    if catalog is None:
+        return None
+    rebuild_manifest(manifest_path, game_path, catalog)
+    entries = read_manifest(manifest_path).get("mods", [])
+    mods = [e["id"] for e in entries if isinstance(e, dict) and e.get("id") and e.get("enabled", True)]
+
+    profiles = load_profiles()
+    links = dict(profiles.get(name, {}).get("links", {}))
+    graph_links = DependencyGraph.from_catalog(catalog).links
+    for mod_name in mods:
+        link = graph_links.get(mod_name.lower())
+        if link:
+            links[mod_name] = link
+    profiles[name] = {"mods": mods, "links": {m: l for m, l in links.items() if m in mods}}
+    save_profiles(profiles, active=name)
+    ledger.success(f"Saved profile '{name}' ({len(mods)} mods).")
+    return profiles[name]
+
+def delete_profile(name):
+    profiles = load_profiles()
+    if profiles.pop(name, None) is None:
+        ledger.error(f"No profile called '{name}'.")
+        return False
+    active = load_settings().get("ActiveProfile")
+    save_profiles(profiles, active="" if active == name else None)
+    ledger.success(f"Deleted profile '{name}'.")
+    return True
+
+@ledger.traced("profile-switch")
+def switch_profile(name, manifest_path, game_path, allowlist, catalog=None, workers=None, ask=ask_user, refresh=False):
+    """
+    Enable exactly the mods in a profile with a single manifest write. Mods parked in Disabled/ are moved
+    back, and mods that are not installed at all are fetched in parallel (from the artifact cache when possible).
+    """
+    profile = load_profiles().get(name)
+    if profile is None:
+        ledger.error(f"No profile called '{name}'.")
+        return None
+    catalog = get_catalog(game_path, catalog)
+    if catalog is None:
+        return None
 
-        except Exception as e:
-            ledger.error(f"Error reading {ksamm_toml}: {e}")
+    wanted = {m.lower(): m for m in profile.get("mods", [])}
+    links = {m.lower(): l for m, l in profile.get("links", {}).items()}
+    installed = catalog.installed_names()
+    restored = []
+    for folder, mod_name in parked_mods(game_path):
+        if mod_name.lower() in wanted and mod_name.lower() not in installed:
+            unpark_mod(game_path, catalog, folder)
+            installed[mod_name.lower()] = folder
+            restored.append(mod_name)
+
+    missing = {key: {"name": mod_name, "link": links.get(key), "required": True, "needed_by": [f"profile '{name}'"]}
+               for key, mod_name in wanted.items() if key not in installed}
+    fetched = {}
+    if missing:
+        approved = approve_dependencies(missing, allowlist, ask)
+        if approved:
+            ledger.heading(f"Fetching {len(approved)} mod{'' if len(approved) == 1 else 's'} for profile '{name}'...")
+            fetched = download_dependencies(approved, catalog, workers, refresh)
+
+    flags = {}
+    for folder, mod_name in catalog.named_mods():
+        flags[mod_name.lower()] = folder.lower() == "core" or mod_name.lower() in wanted
+    set_manifest_flags(manifest_path, catalog, flags)
+    save_profiles(load_profiles(), active=name)
+
+    still_missing = [mod_name for key, mod_name in wanted.items() if key not in catalog.installed_names()]
+    for mod_name in still_missing:
+        ledger.error(f"'{mod_name}' from profile '{name}' is not installed.")
+    enabled = sum(1 for on in flags.values() if on)
+    ledger.success(f"Switched to profile '{name}' ({enabled} mods enabled).")
+    return {"enabled": enabled, "restored": restored, "fetched": fetched, "missing": still_missing}
+
+def manage_profiles(manifest_path, game_path, allowlist):
+    while True:
+        profiles = load_profiles()
+        active = load_settings().get("ActiveProfile")
+        ledger.heading("Profiles")
+        if profiles:
+            ledger.block({p: f"{len(profiles[p].get('mods', []))} mods{' (active)' if p == active else ''}" for p in profiles})
+        else:
+            ledger.info("No profiles saved yet.")
+        print("1. Switch profile")
+        print("2. Save current mods as a profile")
+        print("3. Delete profile")
+        choice = input("Choose option, or 'q' to quit: ")
+        if choice.lower() == "q":
+            return
+        if choice == "1":
+            switch_profile(input("Profile name: ").strip(), manifest_path, game_path, allowlist)
+        elif choice == "2":
+            name = input("Profile name: ").strip()
+            if name:
+                save_profile(name, manifest_path, game_path)
+        elif choice == "3":
+            delete_profile(input("Profile name: ").strip())
+        else:
+            ledger.error("Invalid choice.")
 
-    rebuild_manifest(manifest_path, game_path)
-    ledger.success("Dependency installation complete and manifest updated.")
 
+# ===================== HTTP =====================
+class HttpClient:
+    """One pooled, keep-alive session for every GitHub API call and download."""
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, timeout=30, retries=3, backoff=0.5, pool_size=8):
+        import certifi, requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = f"KSAMM/{KSAMM_VERSION}"
+        self.session.verify = certifi.where()
+
+    def get(self, url, stream=False, headers=None):
+        response = self.session.get(url, stream=stream, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
 
-# ===================== Install Logic =====================
-def install_mod_from_link(download_url, extract_dir):
+    def head(self, url):
+        response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def close(self):
+        self.session.close()
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def http_client():
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            settings = load_settings()
+            workers = max(worker_count(None, "InstallWorkers"), worker_count(None, "DownloadWorkers"))
+            _http_client = HttpClient(timeout=settings["HttpTimeout"], retries=settings["HttpRetries"], pool_size=workers)
+        return _http_client
+
+
+# GitHub release JSON, cached on disk with its ETag/Last-Modified and once per session in memory
+_release_memo = {}
+_release_lock = threading.Lock()  # guards release_cache.json and _release_url_locks, never held over the network
+_release_url_locks = {}
+
+def release_url_lock(url):
+    # Callers asking for the same release share one request, different releases don't wait on each other
+    with _release_lock:
+        return _release_url_locks.setdefault(url, threading.Lock())
+
+def load_release_cache():
     try:
-        ledger.info(f"Downloading mod from {download_url}...")
+        with open(RELEASE_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
 
-        req = Request(download_url, headers={"User-Agent": "KSAMM-Updater"})
-        with urlopen(req, context=ssl_context) as resp:
-            data = resp.read()
+def save_release_cache(cache):
+    try:
+        atomic_write_bytes(RELEASE_CACHE_FILE, json.dumps(cache).encode("utf-8"))
+    except OSError as e:
+        ledger.error(f"Could not save release cache: {e}")
+
+def fetch_release(url, client=None):
+    with release_url_lock(url):
+        if url in _release_memo:
+            return _release_memo[url]
+
+        with _release_lock:
+            entry = load_release_cache().get(url)
+        ttl = load_settings().get("ReleaseCacheTTL", 0)
+        if entry and time.time() - entry.get("fetched_at", 0) < ttl:
+            _release_memo[url] = entry["data"]
+            return entry["data"]
+
+        headers = {"Accept": "application/vnd.github+json"}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
 
         try:
-            z = zipfile.ZipFile(io.BytesIO(data))
+            with (client or http_client()).get(url, headers=headers) as response:
+                if response.status_code == 304 and entry:
+                    data = entry["data"]
+                else:
+                    data = response.json()
+                    entry = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                        "data": data,
+                    }
+        except Exception as e:
+            if not entry:
+                raise
+            # Not memoised, so a later call gets another chance at the network
+            ledger.warning(f"Using cached release info for {url}: {e}")
+            return entry["data"]
+
+        entry["fetched_at"] = time.time()
+        with _release_lock:
+            # Re-read so a release fetched meanwhile on another thread is not dropped
+            cache = load_release_cache()
+            cache[url] = entry
+            save_release_cache(cache)
+        _release_memo[url] = data
+        return data
+
+
+# ===================== Install Logic =====================
+def response_validators(response):
+    """What identifies the version a URL served: ETag, Last-Modified, and where redirects ended up."""
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "final_url": response.url,
+        "size": int(response.headers.get("Content-Length") or 0) or None,
+    }
+
+def download_to_file(url, work_dir=None, label="Downloading", show_progress=True, validators=None):
+    """
+    Stream url into a temp file in work_dir (keep it on the destination volume). Returns (path, sha256, size).
+    If a validators dict is passed it is filled in from the response.
+    """
+    import hashlib, tempfile
+    work_dir = work_dir or tempfile.gettempdir()
+    os.makedirs(work_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=work_dir, prefix=".ksamm-", suffix=".part")
+    try:
+        with ledger.span("download", url=url) as span, os.fdopen(fd, "wb") as f, http_client().get(url, stream=True) as resp:
+            total = int(resp.headers.get("Content-Length") or 0) or None
+            if validators is not None:
+                validators.update(response_validators(resp))
+            last_shown = 0.0
+            for chunk in resp.iter_content(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                now = time.monotonic()
+                if show_progress and now - last_shown > 0.2:
+                    ledger.progress(label, size, total)
+                    last_shown = now
+            if show_progress:
+                ledger.progress(label, size, total)
+                ledger.progress_done()
+            span.args["bytes"] = size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    ledger.count("bytes_downloaded", size)
+    ledger.count("files_downloaded")
+    return tmp_path, digest.hexdigest(), size
+
+# ===================== Artifact Cache =====================
+class ArtifactCache:
+    """Downloaded archives stored by SHA-256, looked up by URL (or another key), with an LRU size cap."""
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(folder, "index.json")
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self.index = self.load()
+
+    def load(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if isinstance(index.get("keys"), dict) and isinstance(index.get("blobs"), dict):
+                index.setdefault("validators", {})
+                return index
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {"keys": {}, "blobs": {}, "validators": {}}
+
+    def save(self):
+        try:
+            atomic_write_bytes(self.index_file, json.dumps(self.index).encode("utf-8"))
+        except OSError as e:
+            ledger.error(f"Could not save artifact cache index: {e}")
+
+    def blob_path(self, sha256):
+        return os.path.join(self.folder, f"{sha256}.zip")
+
+    def lookup(self, key):
+        with self.lock:
+            sha256 = self.index["keys"].get(key)
+            blob = self.index["blobs"].get(sha256) if sha256 else None
+            if not blob:
+                return None, None
+            path = self.blob_path(sha256)
+            try:
+                if os.path.getsize(path) != blob["size"]:
+                    raise OSError("size mismatch")
+            except OSError:
+                self.forget(sha256)
+                self.save()
+                return None, None
+            blob["last_used"] = time.time()
+            self.save()
+            return path, sha256
+
+    def validators(self, key):
+        with self.lock:
+            return dict(self.index["validators"].get(key) or {})
+
+    def store(self, key, file_path, sha256, validators=None):
+        with self.lock:
+            path = self.blob_path(sha256)
+            if os.path.exists(path):
+                os.remove(file_path)
+            else:
+                os.replace(file_path, path)
+            self.index["keys"][key] = sha256
+            if validators:
+                self.index["validators"][key] = validators
+            self.index["blobs"][sha256] = {"size": os.path.getsize(path), "last_used": time.time()}
+            self.evict(keep=sha256)
+            self.save()
+            return path
+
+    def forget(self, sha256):
+        self.index["blobs"].pop(sha256, None)
+        for key in [k for k, v in self.index["keys"].items() if v == sha256]:
+            del self.index["keys"][key]
+            self.index["validators"].pop(key, None)
+
+    def evict(self, keep=None):
+        total = sum(b["size"] for b in self.index["blobs"].values())
+        for sha256, blob in sorted(self.index["blobs"].items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            try:
+                os.remove(self.blob_path(sha256))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # still open somewhere (Windows), try again next time
+            total -= blob["size"]
+            self.forget(sha256)
+
+_artifact_cache = None
+
+def artifact_cache():
+    global _artifact_cache
+    with _http_client_lock:
+        if _artifact_cache is None:
+            max_mb = load_settings().get("ArtifactCacheMaxMB", 0) or 0
+            _artifact_cache = ArtifactCache(ARTIFACT_CACHE_FOLDER, int(max_mb) * 1024 * 1024)
+        return _artifact_cache
+
+def is_versioned_release_asset(url):
+    """GitHub assets under /releases/download/<tag>/ never change (unlike /releases/latest/download/)."""
+    from urllib.parse import urlsplit
+    parts = urlsplit(url)
+    segments = parts.path.strip("/").split("/")
+    return parts.netloc.lower() == "github.com" and len(segments) == 6 and segments[2:4] == ["releases", "download"]
+
+def url_without_query(url):
+    from urllib.parse import urlsplit
+    return urlsplit(url)._replace(query="", fragment="").geturl()
+
+def cached_copy_is_current(url, validators):
+    """
+    Ask the server (HEAD) whether url still serves the archive we cached. An ETag decides on its own. Otherwise
+    "latest" links like SpaceDock's /download redirect to a versioned file, so the final URL tells versions apart.
+    Its query string is ignored, GitHub redirects assets to signed URLs that change on every request.
+    Offline, on errors, or with nothing to compare, the cached copy is kept.
+    """
+    if not validators or load_settings().get("OfflineMode"):
+        return True
+    try:
+        with http_client().head(url) as response:
+            current = response_validators(response)
+    except Exception as e:
+        ledger.warning(f"Could not check {url} for a newer version, using the cached copy: {e}")
+        return True
+    if validators.get("etag") and current.get("etag"):
+        return validators["etag"] == current["etag"]
+    # A different final URL means a different file, an equal one only says the link still points there
+    cached_url, current_url = validators.get("final_url"), current.get("final_url")
+    if cached_url and current_url and url_without_query(cached_url) != url_without_query(current_url):
+        return False
+    # Last-Modified only has one-second resolution, so a changed size counts even when it matches
+    return all(validators[field] == current[field] for field in ("last_modified", "size")
+               if validators.get(field) and current.get(field))
+
+def fetch_archive(url, key=None, label="Downloading", show_progress=True, refresh=False):
+    """
+    Path and SHA-256 of the archive behind url, from the artifact cache when it is still current. Copies cached
+    under a custom key (e.g. one with a version in it) and versioned release assets are trusted as they are.
+    Don't delete the returned path.
+    """
+    cache = artifact_cache()
+    revalidate = key is None and not is_versioned_release_asset(url)
+    key = key or url
+    if not refresh:
+        path, sha256 = cache.lookup(key)
+        if path and (not revalidate or cached_copy_is_current(url, cache.validators(key))):
+            ledger.info(f"Using cached copy of {url}")
+            return path, sha256
+        if path:
+            ledger.info(f"{url} has changed since it was cached, downloading it again.")
+    validators = {}
+    tmp_path, sha256, _ = download_to_file(url, cache.folder, label, show_progress, validators)
+    return cache.store(key, tmp_path, sha256, validators), sha256
+
+def install_mod_from_link(download_url, extract_dir, show_progress=True, refresh=False, install_run=None):
+    import zipfile
+    install_run = install_run or InstallRun()
+    try:
+        ledger.info(f"Fetching mod from {download_url}...")
+        archive_path, sha256 = fetch_archive(download_url, show_progress=show_progress, refresh=refresh)
+        ledger.info(f"SHA-256: {sha256}")
+
+        try:
+            z = zipfile.ZipFile(archive_path)
         except zipfile.BadZipFile:
             ledger.error(f"Downloaded file from {download_url} is not a valid zip.")
             return None
 
-        z.extractall(extract_dir)
-        folder_name = z.namelist()[0].split("/")[0]
-        return folder_name
+        with z:
+            report = preflight_zip(z.infolist())
+            if report["problems"]:
+                ledger.error(f"Refusing {download_url}: {'; '.join(report['problems'])}.")
+                return None
+            stage = staging_dir(extract_dir)
+            try:
+                z.extractall(stage)
+                if not install_run.commit(stage, extract_dir, report["top_level"], download_url):
+                    return None
+            finally:
+                discard_staging(stage)
+        # The first mod is the one the link is for, the rest are installed alongside it
+        return report["mod_folders"] + [folder for folder in report["top_level"] if folder not in report["mod_folders"]]
 
     except Exception as e:
         ledger.error(f"Failed to install mod from {download_url}: {e}")
@@ -588,9 +2277,7 @@ def install_mod_from_link(download_url, extract_dir):
 def check_for_updates():
     ledger.info("Checking for KSAMM updates...")
     try:
-        req = Request(GITHUB_RELEASES_API)
-        with urlopen(req, context=ssl_context) as r:
-            data = json.load(r)
+        data = fetch_release(GITHUB_RELEASES_API)
 
         latest = data.get("tag_name")
         if not latest:
@@ -612,28 +2299,84 @@ def check_for_updates():
         ledger.error(f"Update check failed: {e}")
         return None, None
 
-def startup_update_warn():
+# The startup check runs on a daemon thread so a slow or missing network never holds up the
+# menu, whatever it finds is shown the next time the menu is drawn
+_startup_check = {"started": None, "finished": None, "latest": None}
+
+def _startup_update_worker():
+    # Its own client: one try, bounded by the deadline, instead of HttpTimeout with every retry
+    client = HttpClient(timeout=STARTUP_CHECK_DEADLINE, retries=0, pool_size=1)
     try:
-        req = Request(GITHUB_RELEASES_API)
-        with urlopen(req, context=ssl_context) as r:
-            data = json.load(r)
-        latest = data.get("tag_name")
-        if not latest:
-            ledger.error("Unable to get latest update information.")
-            return None, None
-        if latest == KSAMM_VERSION:
-            return latest, None
-        ledger.heading(f"New KSAMM Version Available: {latest}")
-    except Exception as e:
-        ledger.error(f"{e}")
+        latest = fetch_release(GITHUB_RELEASES_API, client).get("tag_name")
+    except Exception:
+        latest = None
+    finally:
+        client.close()
+    _startup_check["latest"] = latest
+    _startup_check["finished"] = time.monotonic()
+
+def start_startup_update_check():
+    _startup_check["started"] = time.monotonic()
+    threading.Thread(target=_startup_update_worker, name="ksamm-update-check", daemon=True).start()
+
+def show_startup_notice():
+    started, finished = _startup_check["started"], _startup_check["finished"]
+    if started is None or finished is None:
+        return
+    latest = _startup_check["latest"]
+    _startup_check["started"] = None
+    if finished - started > STARTUP_CHECK_DEADLINE or not latest:
+        return
+    if latest.lstrip("v") != KSAMM_VERSION:
+        ledger.heading(f"New KSAMM Version Available: {latest} (use option 4 to update)")
+
+
+def file_crc32(path):
+    import zlib
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+def plan_update_members(z, install_dir):
+    """
+    Compare the update zip's central directory (size + CRC-32) against the installed files and
+    return [(member, path relative to the install)] for the ones that differ, plus the unchanged count.
+    """
+    files = [info for info in z.infolist() if not info.is_dir()]
+    # The install root is wherever KSAModManager.exe sits inside the zip
+    root = ""
+    for info in files:
+        if os.path.basename(info.filename).lower() == "ksamodmanager.exe":
+            root = os.path.dirname(info.filename)
+            break
 
+    changed = []
+    unchanged = 0
+    for info in files:
+        if root and not info.filename.startswith(root + "/"):
+            continue
+        rel_path = info.filename[len(root) + 1:] if root else info.filename
+        installed = os.path.join(install_dir, *rel_path.split("/"))
+        try:
+            same = os.path.getsize(installed) == info.file_size and file_crc32(installed) == info.CRC
+        except OSError:
+            same = False
+        if same:
+            unchanged += 1
+        else:
+            changed.append((info, rel_path))
+    return changed, unchanged
 
-def install_update(download_url):
+@ledger.traced("self-update")
+def install_update(download_url, version=None):
+    import subprocess, tempfile, zipfile
     ledger.info("Downloading update...")
-    tmp_zip = os.path.join(tempfile.gettempdir(), "ksam_update.zip")
     try:
-        with urlopen(Request(download_url), context=ssl_context) as r, open(tmp_zip,"wb") as f:
-            f.write(r.read())
+        # The SpaceDock link always serves the latest build, so the version is part of the cache key
+        key = f"{download_url}#{version}" if version else None
+        tmp_zip, _ = fetch_archive(download_url, key, "Downloading update", refresh=not version)
     except Exception as e:
         ledger.error(f"Failed to download update: {e}")
         return
@@ -642,16 +2385,34 @@ def install_update(download_url):
     if os.path.exists(extract_dir):
         shutil.rmtree(extract_dir)
     os.makedirs(extract_dir, exist_ok=True)
-    with zipfile.ZipFile(tmp_zip,"r") as z:
-        z.extractall(extract_dir)
-    ledger.success("Update extracted.")
     install_dir = os.path.dirname(sys.executable if getattr(sys,"frozen",False) else __file__)
+    with zipfile.ZipFile(tmp_zip,"r") as z:
+        problems = preflight_zip(z.infolist(), require_mod=False)["problems"]
+        if problems:
+            ledger.error(f"Update archive rejected: {'; '.join(problems)}.")
+            return
+        changed, unchanged = plan_update_members(z, install_dir)
+        for info, rel_path in changed:
+            target = os.path.join(extract_dir, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with z.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+    ledger.success(f"Update extracted ({len(changed)} changed file(s), {unchanged} unchanged).")
     updater_path = os.path.join(install_dir, "UpdateHelper.exe")
+    # UpdateHelper never replaces itself, and it isn't running yet, so a new one is moved in here
+    for info, rel_path in changed:
+        if rel_path.lower() == "updatehelper.exe":
+            try:
+                os.replace(os.path.join(extract_dir, rel_path), updater_path)
+                ledger.info("UpdateHelper.exe updated.")
+            except OSError as e:
+                ledger.warning(f"Could not update UpdateHelper.exe, using the installed one: {e}")
+            break
     if not os.path.exists(updater_path):
         ledger.error("UpdateHelper.exe not found.")
         return
     ledger.info("Starting updater...")
-    subprocess.Popen([updater_path, extract_dir, install_dir], close_fds=True)
+    subprocess.Popen([updater_path, extract_dir, install_dir, str(os.getpid())], close_fds=True)
     time.sleep(0.2)
     sys.exit(0)
 
@@ -666,9 +2427,7 @@ def check_starmap_update():
         curr_starmap_version = "0.0.0"
 
     try:
-        req = Request(STARMAP_DOWNLOAD)
-        with urlopen(req, context=ssl_context) as r:
-            data = json.load(r)
+        data = fetch_release(STARMAP_DOWNLOAD)
 
         latest_starmap = data.get("tag_name")
         if not latest_starmap:
@@ -692,7 +2451,9 @@ def check_starmap_update():
         return None, None
 
 
+@ledger.traced("starmap-update")
 def update_starmap(mod_loader_path):
+    import zipfile
     if not mod_loader_path:
         ledger.error("Mod loader path not set. Cannot update StarMap.")
         return
@@ -700,9 +2461,7 @@ def update_starmap(mod_loader_path):
     ledger.info("Updating StarMap...")
 
     try:
-        response = requests.get(STARMAP_DOWNLOAD)
-        response.raise_for_status()
-        latest_release = response.json()
+        latest_release = fetch_release(STARMAP_DOWNLOAD)
         mod_loader_version = latest_release.get("tag_name")
 
         zip_asset = next((a for a in latest_release["assets"] if a["name"].endswith(".zip")), None)
@@ -712,12 +2471,10 @@ def update_starmap(mod_loader_path):
 
         zip_url = zip_asset["browser_download_url"]
         ledger.info(f"Downloading {zip_asset['name']}...")
-        r = requests.get(zip_url)
-        r.raise_for_status()
-
-        z = zipfile.ZipFile(io.BytesIO(r.content))
-        os.makedirs(mod_loader_path, exist_ok=True)
-        z.extractall(mod_loader_path)
+        archive_path, _ = fetch_archive(zip_url, label=f"Downloading {zip_asset['name']}")
+        with zipfile.ZipFile(archive_path) as z:
+            os.makedirs(mod_loader_path, exist_ok=True)
+            z.extractall(mod_loader_path)
 
         ledger.info(f"StarMap updated to {mod_loader_version} at {mod_loader_path}")
 
@@ -740,6 +2497,7 @@ def update_starmap(mod_loader_path):
 
 # ===================== Game Launch =====================
 def launch_game(game_path, mod_loader_path=None):
+    import subprocess
     game_exe = os.path.join(game_path, "KSA.exe")
     mod_loader_exe = None
     if mod_loader_path:
@@ -751,18 +2509,337 @@ def launch_game(game_path, mod_loader_path=None):
     if mod_loader_exe:
         ledger.info(f"Launching game via Mod Loader: {mod_loader_exe}")
         subprocess.Popen([mod_loader_exe], cwd=mod_loader_path)
-        return
+        return mod_loader_exe
     if os.path.exists(game_exe):
         ledger.info(f"Launching game directly: {game_exe}")
         subprocess.Popen([game_exe], cwd=game_path)
-        return
+        return game_exe
     ledger.error("Could not find game executable or mod loader.")
     ledger.info(f"Tried:\n  Mod Loader: {mod_loader_exe or '[mod loader disabled]'}\n  Game EXE: {game_exe}")
+    return None
+
+# ===================== Batch CLI =====================
+def add_decision_flags(parser):
+    parser.add_argument("--allow-unlisted", action="store_true",
+                        help="add dependency links that are not in the allowlist to it and install them")
+    parser.add_argument("--optional", action="store_true", help="install optional dependencies too")
+    parser.add_argument("--workers", type=int, default=None, help="worker threads (default from config.toml)")
+    parser.add_argument("--refresh", action="store_true", help="download links again even if a cached copy looks current")
+
+def cli_decisions(args):
+    answers = {"optional": args.optional, "allowlist": args.allow_unlisted}
+    def ask(question, kind=None):
+        answer = answers.get(kind, False)
+        ledger.info(f"{question} -> {'yes' if answer else 'no'}")
+        return answer
+    return ask
+
+def cli_paths(args):
+    manifest, game_path, mod_loader_path, mod_loader_version, allowlist = load_paths()
+    return (args.manifest or manifest, args.game or game_path, args.mod_loader or mod_loader_path,
+            mod_loader_version, allowlist or [])
+
+def cli_install(args):
+    manifest, game_path, _, _, allowlist = cli_paths(args)
+    if not game_path:
+        return {"ok": False, "error": "Game path not set."}
+    catalog = None
+    archives = {}
+    if args.archives or not args.url:
+        catalog, results = install_mods(manifest, game_path, workers=args.workers,
+                                        zip_paths=[os.path.abspath(a) for a in args.archives] or None)
+        archives = {os.path.basename(path): {"ok": r["ok"], "folders": r["top_level"],
+                                             "error": str(r["error"]) if r["error"] else None}
+                    for path, r in results.items()}
+    links = {}
+    if args.url:
+        catalog = get_catalog(game_path, catalog)
+        install_run = InstallRun()
+        for url in args.url:
+            folders = install_mod_from_link(url, catalog.content_path, refresh=args.refresh, install_run=install_run)
+            links[url] = folders
+            for folder in folders or []:
+                catalog.add_folder(folder)
+        rebuild_manifest(manifest, game_path, catalog)
+    dependencies = {}
+    if args.deps:
+        # install_mods returns no catalog when ModSetup had nothing to install
+        catalog = get_catalog(game_path, catalog)
+        if catalog is None:
+            return {"ok": False, "error": "Content folder missing.", "archives": archives, "links": links}
+        dependencies = install_dependencies(game_path, manifest, allowlist, catalog, args.workers,
+                                            ask=cli_decisions(args), refresh=args.refresh)
+    # Declined or linkless dependencies never show up in the results, so check what is still missing
+    missing = [entry["name"] for entry in DependencyGraph.from_catalog(catalog).missing().values()
+               if entry["required"]] if args.deps else []
+    ok = (all(a["ok"] for a in archives.values()) and all(links.values()) and all(dependencies.values())
+          and not missing)
+    return {"ok": ok, "archives": archives, "links": links, "dependencies": dependencies, "missing": missing}
+
+def cli_remove(args):
+    manifest, game_path, _, _, _ = cli_paths(args)
+    catalog = get_catalog(game_path) if game_path else None
+    if catalog is None:
+        return {"ok": False, "error": "Game path not set or Content folder missing."}
+    removed, not_found = [], []
+    for wanted in args.mods:
+        folder, mod_name = find_installed_mod(catalog, wanted)
+        if not folder or folder.lower() == "core":
+            ledger.error(f"No installed mod called '{wanted}'.")
+            not_found.append(wanted)
+            continue
+        remove_mod(catalog, folder)
+        ledger.success(f"Deleted {mod_name}")
+        removed.append({"name": mod_name, "folder": folder})
+    if removed:
+        rebuild_manifest(manifest, game_path, catalog)
+    return {"ok": not not_found, "removed": removed, "not_found": not_found}
+
+def cli_toggle(args):
+    manifest, game_path, _, _, _ = cli_paths(args)
+    catalog = get_catalog(game_path) if game_path else None
+    if catalog is None or not manifest:
+        return {"ok": False, "error": "Manifest and game paths must be set."}
+    enabled = args.command == "enable"
+    names, moved, not_found = [], [], []
+    for wanted in args.mods:
+        folder, mod_name = find_installed_mod(catalog, wanted)
+        if enabled and not folder:
+            folder, mod_name = find_parked_mod(game_path, wanted)
+            if folder:
+                unpark_mod(game_path, catalog, folder)
+                moved.append(mod_name)
+        if not folder or folder.lower() == "core":
+            ledger.error(f"No mod called '{wanted}'.")
+            not_found.append(wanted)
+            continue
+        if not enabled and args.move:
+            park_mod(game_path, catalog, folder)
+            moved.append(mod_name)
+        names.append(mod_name)
+    if not enabled and args.move:
+        rebuild_manifest(manifest, game_path, catalog)
+    else:
+        set_mods_enabled(manifest, catalog, names, enabled)
+    for mod_name in names:
+        ledger.success(f"{'Enabled' if enabled else 'Disabled'} {mod_name}")
+    return {"ok": not not_found, "enabled" if enabled else "disabled": names, "moved": moved, "not_found": not_found}
+
+def cli_profile(args):
+    manifest, game_path, _, _, allowlist = cli_paths(args)
+    if args.action == "list":
+        active = load_settings().get("ActiveProfile")
+        profiles = load_profiles()
+        for name, profile in profiles.items():
+            ledger.info(f"{name}: {', '.join(profile.get('mods', []))}{' (active)' if name == active else ''}")
+        return {"ok": True, "active": active, "profiles": profiles}
+    if not args.name:
+        return {"ok": False, "error": f"profile {args.action} needs a profile name."}
+    if args.action == "delete":
+        return {"ok": delete_profile(args.name)}
+    if not game_path or not manifest:
+        return {"ok": False, "error": "Manifest and game paths must be set."}
+    if args.action == "save":
+        profile = save_profile(args.name, manifest, game_path)
+        return {"ok": profile is not None, "profile": profile}
+    result = switch_profile(args.name, manifest, game_path, allowlist, workers=args.workers,
+                            ask=cli_decisions(args), refresh=args.refresh)
+    if result is None:
+        return {"ok": False}
+    return {"ok": not result["missing"], **result}
+
+def cli_rollback(args):
+    manifest, game_path, _, _, _ = cli_paths(args)
+    catalog = get_catalog(game_path) if game_path else None
+    if catalog is None:
+        return {"ok": False, "error": "Game path not set or Content folder missing."}
+    rolled_back, failed = [], []
+    for wanted in args.mods:
+        folder, _ = find_installed_mod(catalog, wanted)
+        folder = folder or wanted
+        try:
+            done = rollback_mod(catalog, folder)
+        except OSError as e:
+            ledger.error(f"Could not roll back {folder}: {e}")
+            done = False
+        if done:
+            ledger.success(f"Rolled back {folder}")
+            rolled_back.append(folder)
+        else:
+            if not os.path.isdir(backup_path(catalog, folder)):
+                ledger.error(f"No previous version of '{wanted}' is kept.")
+            failed.append(wanted)
+    if rolled_back:
+        rebuild_manifest(manifest, game_path, catalog)
+    return {"ok": not failed, "rolled_back": rolled_back, "failed": failed}
+
+def cli_watch(args):
+    manifest, game_path, _, _, _ = cli_paths(args)
+    if not game_path or not manifest:
+        return {"ok": False, "error": "Manifest and game paths must be set."}
+    outcomes = watch_mod_setup(manifest, game_path, settle=args.settle, poll=args.poll)
+    return {"ok": all(outcomes.values()), "archives": outcomes}
+
+def cli_rebuild_manifest(args):
+    manifest, game_path, _, _, _ = cli_paths(args)
+    if not game_path or not manifest:
+        return {"ok": False, "error": "Manifest and game paths must be set."}
+    changes = rebuild_manifest(manifest, game_path)
+    return {"ok": changes is not None, "changes": changes}
+
+def cli_deps(args):
+    manifest, game_path, _, _, allowlist = cli_paths(args)
+    if not game_path:
+        return {"ok": False, "error": "Game path not set."}
+    if not args.resolve:
+        plan = install_dependencies(game_path, manifest, allowlist, dry_run=True)
+        return {"ok": not plan.get("cycles"), "plan": plan}
+    results = install_dependencies(game_path, manifest, allowlist, workers=args.workers,
+                                   ask=cli_decisions(args), refresh=args.refresh)
+    return {"ok": all(results.values()), "installed": results}
+
+def cli_launch(args):
+    _, game_path, mod_loader_path, _, _ = cli_paths(args)
+    if not game_path:
+        return {"ok": False, "error": "Game path not set."}
+    launched = launch_game(game_path, mod_loader_path)
+    return {"ok": launched is not None, "launched": launched}
+
+def cli_update(args):
+    manifest, game_path, mod_loader_path, mod_loader_version, allowlist = cli_paths(args)
+    result = {"ok": True, "ksamm": {"current": KSAMM_VERSION}}
+    latest, url = check_for_updates()
+    result["ksamm"].update({"latest": latest, "download": url})
+    result["ok"] = latest is not None
+    if mod_loader_path:
+        latest_starmap, _ = check_starmap_update()
+        result["starmap"] = {"current": mod_loader_version, "latest": latest_starmap}
+        if args.starmap and latest_starmap and latest_starmap != mod_loader_version:
+            new_version = update_starmap(mod_loader_path)
+            if new_version:
+                save_paths(manifest, game_path, mod_loader_path, new_version, allowlist)
+            result["starmap"]["installed"] = new_version
+    if args.self_update and url:
+        install_update(url, latest)
+    return result
+
+def build_parser():
+    import argparse
+    parser = argparse.ArgumentParser(prog="KSAModManager", description="Kitten Space Agency Mod Manager. Run without a command for the menu.")
+    parser.add_argument("--offline", action="store_true", help="skip every network check at startup")
+    parser.add_argument("--timings", action="store_true", help="print how long it took to reach the menu, and where time went on exit")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="write a cProfile dump and a Chrome trace on exit, see --cprofile-out")
+    parser.add_argument("--cprofile-out", default="ksamm_profile", metavar="PREFIX",
+                        help="file name prefix for --cprofile: PREFIX.prof and PREFIX.trace.json (default: ksamm_profile)")
+    parser.add_argument("--manifest", help="manifest.toml to use instead of the one in config.toml")
+    parser.add_argument("--game", help="game folder to use instead of the one in config.toml")
+    parser.add_argument("--mod-loader", help="mod loader folder to use instead of the one in config.toml")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON on stdout (log goes to stderr)")
+    commands = parser.add_subparsers(dest="command")
+
+    install = commands.add_parser("install", help="install zips from ModSetup, the given archives or links")
+    install.add_argument("archives", nargs="*", help="zip files to install (default: everything in ModSetup)")
+    install.add_argument("--url", action="append", help="download and install a mod from a link, can repeat")
+    install.add_argument("--deps", action="store_true", help="resolve and install dependencies afterwards")
+    add_decision_flags(install)
+    install.set_defaults(handler=cli_install)
+
+    remove = commands.add_parser("remove", help="delete installed mods by name or folder")
+    remove.add_argument("mods", nargs="+")
+    remove.set_defaults(handler=cli_remove)
+
+    watch = commands.add_parser("watch", help="install zips as they are saved into ModSetup, until Ctrl+C")
+    watch.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS,
+                       help="seconds a zip must stay unchanged before it is installed")
+    watch.add_argument("--poll", type=float, default=WATCH_POLL_SECONDS, help="seconds between checks when polling")
+    watch.set_defaults(handler=cli_watch)
+
+    rollback = commands.add_parser("rollback", help="swap mods back to the version their last install replaced")
+    rollback.add_argument("mods", nargs="+")
+    rollback.set_defaults(handler=cli_rollback)
+
+    enable = commands.add_parser("enable", help="enable mods, moving them back from Disabled/ if needed")
+    enable.add_argument("mods", nargs="+")
+    enable.set_defaults(handler=cli_toggle)
+
+    disable = commands.add_parser("disable", help="disable mods in manifest.toml without deleting them")
+    disable.add_argument("mods", nargs="+")
+    disable.add_argument("--move", action="store_true", help="also move the folders to Disabled/ next to Content/")
+    disable.set_defaults(handler=cli_toggle)
+
+    profile = commands.add_parser("profile", help="list, save, switch to (use) or delete mod profiles")
+    profile.add_argument("action", choices=["list", "save", "use", "delete"])
+    profile.add_argument("name", nargs="?")
+    add_decision_flags(profile)
+    profile.set_defaults(handler=cli_profile)
+
+    rebuild = commands.add_parser("rebuild-manifest", help="bring manifest.toml in line with Content/")
+    rebuild.set_defaults(handler=cli_rebuild_manifest)
+
+    deps = commands.add_parser("deps", help="show the dependency plan, or install it with --resolve")
+    deps.add_argument("--resolve", action="store_true", help="install missing dependencies")
+    add_decision_flags(deps)
+    deps.set_defaults(handler=cli_deps)
+
+    launch = commands.add_parser("launch", help="start the game, through the mod loader if one is set")
+    launch.set_defaults(handler=cli_launch)
+
+    update = commands.add_parser("update", help="check KSAMM and StarMap for updates")
+    update.add_argument("--check", action="store_true", help="only report what is available (default)")
+    update.add_argument("--starmap", action="store_true", help="install a newer StarMap if there is one")
+    update.add_argument("--self", dest="self_update", action="store_true", help="install a newer KSAMM if there is one")
+    update.set_defaults(handler=cli_update)
+    return parser
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
+
+def run_cli(args):
+    if args.json:
+        ledger.stream = sys.stderr
+    # A fresh machine has no config.toml yet; saving the allowlist needs one
+    create_default_files()
+    try:
+        result = args.handler(args)
+    except Exception as e:
+        ledger.error(f"{args.command} failed: {e}")
+        result = {"ok": False, "error": str(e)}
+    result = {"command": args.command, **result}
+    if args.json:
+        print(json.dumps(result, indent=2, default=str))
+    return 0 if result.get("ok") else 1
+
+def run_profiled(run, args):
+    import cProfile
+    ledger.trace = []
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return run(args)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile_out + ".prof")
+        ledger.write_trace(args.cprofile_out + ".trace.json")
+        ledger.info(f"Profile written to {args.cprofile_out}.prof and {args.cprofile_out}.trace.json")
+
+def main(argv=None):
+    args = parse_args(argv)
+    run = run_cli if args.command else run_menu
+    try:
+        if args.cprofile:
+            return run_profiled(run, args)
+        return run(args)
+    finally:
+        if args.timings or args.cprofile:
+            ledger.report_spans()
 
 # ===================== Main Loop =====================
-def main():
-    initialize()
+def run_menu(args):
+    initialize(offline=args.offline)
+    first_draw = True
     while True:
+        show_startup_notice()
         ledger.header("KSAMM Main Menu")
         print("1. Set paths")
         print("2. Install mods")
@@ -770,7 +2847,12 @@ def main():
         print("4. Check for updates")
         print("5. Launch game")
         print("6. Show metadata")
+        print("7. Profiles")
+        print("8. Watch ModSetup and install new mods automatically")
         print("q. Quit")
+        if first_draw and args.timings:
+            ledger.timing("Time to menu", time.perf_counter() - STARTUP_TIME)
+        first_draw = False
         choice = input("Choose an option: ")
 
         if choice == "1":
@@ -819,8 +2901,8 @@ def main():
             if not game_path:
                 ledger.error("Game path not set.")
                 continue
-            install_mods(manifest, game_path)
-            check_for_metadata(manifest, game_path, allowlist, mode = "dependencies")
+            catalog, _ = install_mods(manifest, game_path)
+            check_for_metadata(manifest, game_path, allowlist, mode = "dependencies", catalog = catalog)
 
         elif choice == "3":
             manifest, game_path, mod_loader_path, mod_loader_version, allowlist = load_paths()
@@ -843,7 +2925,7 @@ def main():
             latest, url = check_for_updates()
             if latest and latest != KSAMM_VERSION:
                 if input("Install now? (y/n): ").lower() == "y":
-                    install_update(url)
+                    install_update(url, latest)
 
         elif choice == "5":
             _, game_path, mod_loader_path, _, allowlist = load_paths()
@@ -856,6 +2938,20 @@ def main():
             manifest, game_path, mod_loader_path, mod_loader_version, allowlist = load_paths()
             check_for_metadata(manifest, game_path, "metadata")
 
+        elif choice == "7":
+            manifest, game_path, mod_loader_path, mod_loader_version, allowlist = load_paths()
+            if not game_path or not manifest:
+                ledger.error("Manifest and game paths must be set.")
+                continue
+            manage_profiles(manifest, game_path, allowlist or [])
+
+        elif choice == "8":
+            manifest, game_path, mod_loader_path, mod_loader_version, allowlist = load_paths()
+            if not game_path:
+                ledger.error("Game path not set.")
+                continue
+            watch_mod_setup(manifest, game_path)
+
         elif choice.lower() == "q":
             break
 
@@ -864,4 +2960,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if getattr(sys, "frozen", False):
+        # Process pool workers of the frozen exe start through here
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(main())
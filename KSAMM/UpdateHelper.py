@@ -2,8 +2,13 @@ import os
 import sys
 import time
 import shutil
+import hashlib
 import subprocess
 
+STAGE_DIR_NAME = ".ksamm_update_stage"
+ROLLBACK_DIR_NAME = ".ksamm_rollback"
+ADDED_LIST_NAME = ".added_files"
+
 def is_process_running(name):
     try:
         out = subprocess.check_output('tasklist', shell=True).decode()
@@ -19,6 +24,67 @@ def wait_for_process_exit(name, check_interval=0.2, timeout=30):
             break
         time.sleep(check_interval)
 
+def pid_is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+def wait_for_pid_windows(pid, timeout):
+    import ctypes
+    SYNCHRONIZE = 0x00100000
+    WAIT_OBJECT_0 = 0
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(SYNCHRONIZE, False, pid)
+    if not handle:
+        return True  # already gone
+    try:
+        return kernel32.WaitForSingleObject(handle, int(timeout * 1000)) == WAIT_OBJECT_0
+    finally:
+        kernel32.CloseHandle(handle)
+
+def wait_for_pid_posix(pid, timeout):
+    import select
+    try:
+        fd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return True
+    except (AttributeError, OSError):
+        fd = None
+    if fd is not None:
+        try:
+            ready, _, _ = select.select([fd], [], [], timeout)
+            return bool(ready)
+        finally:
+            os.close(fd)
+
+    # No pidfd (macOS, old kernels): poll with a growing interval
+    deadline = time.time() + timeout
+    interval = 0.01
+    while pid_is_alive(pid):
+        if time.time() > deadline:
+            return False
+        time.sleep(interval)
+        interval = min(interval * 2, 0.2)
+    return True
+
+def wait_for_pid_exit(pid, timeout=30):
+    """
+    Block until the process with the given PID exits, without polling where the OS can wait for us.
+    """
+    if sys.platform == "win32":
+        exited = wait_for_pid_windows(pid, timeout)
+    else:
+        exited = wait_for_pid_posix(pid, timeout)
+    if not exited:
+        print(f"Warning: process {pid} did not exit after {timeout}s, continuing anyway.")
+    return exited
+
 def delete_existing(dest):
     if os.path.exists(dest):
         if os.path.isdir(dest):
@@ -26,18 +92,116 @@ def delete_existing(dest):
         else:
             os.remove(dest)
 
-def copy_update(src_folder, dest_folder):
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def files_match(src_file, dest_file):
+    if not os.path.isfile(dest_file):
+        return False
+    if os.path.getsize(src_file) != os.path.getsize(dest_file):
+        return False
+    return file_hash(src_file) == file_hash(dest_file)
+
+def plan_update(src_folder, dest_folder):
+    changed = []
+    unchanged = 0
     for root, dirs, files in os.walk(src_folder):
-        rel_path = os.path.relpath(root, src_folder)
-        target_dir = os.path.join(dest_folder, rel_path)
-        os.makedirs(target_dir, exist_ok=True)
+        rel_root = os.path.relpath(root, src_folder)
         for file in files:
             if file.lower() == "updatehelper.exe":
                 continue  # skip overwriting the updater itself
-            src_file = os.path.join(root, file)
-            dest_file = os.path.join(target_dir, file)
+            rel_file = os.path.normpath(os.path.join(rel_root, file))
+            if files_match(os.path.join(src_folder, rel_file), os.path.join(dest_folder, rel_file)):
+                unchanged += 1
+            else:
+                changed.append(rel_file)
+    return changed, unchanged
+
+def rollback(dest_folder, committed):
+    rollback_dir = os.path.join(dest_folder, ROLLBACK_DIR_NAME)
+    for rel_file in reversed(committed):
+        dest_file = os.path.join(dest_folder, rel_file)
+        backup = os.path.join(rollback_dir, rel_file)
+        try:
+            if os.path.exists(backup):
+                delete_existing(dest_file)
+                os.replace(backup, dest_file)
+            else:
+                delete_existing(dest_file)
+        except Exception as e:
+            print(f"Warning: Could not roll back {rel_file}: {e}")
+
+def copy_update(src_folder, dest_folder):
+    """
+    Copy only the files whose hash differs from the installed ones. Changed files are staged
+    next to the install first, then swapped in with renames; whatever they replaced is kept in
+    .ksamm_rollback so a failed update can be undone (and a bad one rolled back with --rollback).
+    """
+    changed, unchanged = plan_update(src_folder, dest_folder)
+    print(f"{len(changed)} file(s) changed, {unchanged} unchanged.")
+    if not changed:
+        return
+
+    stage_dir = os.path.join(dest_folder, STAGE_DIR_NAME)
+    rollback_dir = os.path.join(dest_folder, ROLLBACK_DIR_NAME)
+    delete_existing(stage_dir)
+    delete_existing(rollback_dir)
+
+    for rel_file in changed:
+        staged = os.path.join(stage_dir, rel_file)
+        os.makedirs(os.path.dirname(staged), exist_ok=True)
+        shutil.copy2(os.path.join(src_folder, rel_file), staged)
+
+    committed = []
+    added = []
+    try:
+        for rel_file in changed:
+            dest_file = os.path.join(dest_folder, rel_file)
+            os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+            if os.path.exists(dest_file):
+                backup = os.path.join(rollback_dir, rel_file)
+                os.makedirs(os.path.dirname(backup), exist_ok=True)
+                os.replace(dest_file, backup)
+            else:
+                added.append(rel_file)
+            committed.append(rel_file)
+            os.replace(os.path.join(stage_dir, rel_file), dest_file)
+        # Files that did not exist before have nothing to restore, so remember them for --rollback
+        os.makedirs(rollback_dir, exist_ok=True)
+        with open(os.path.join(rollback_dir, ADDED_LIST_NAME), "w", encoding="utf-8") as f:
+            f.write("\n".join(added))
+    except Exception:
+        print("ERROR: Update failed, rolling back...")
+        rollback(dest_folder, committed)
+        raise
+    finally:
+        delete_existing(stage_dir)
+
+def restore_rollback(install_folder):
+    rollback_dir = os.path.join(install_folder, ROLLBACK_DIR_NAME)
+    if not os.path.isdir(rollback_dir):
+        print("Nothing to roll back.")
+        return
+    added_list = os.path.join(rollback_dir, ADDED_LIST_NAME)
+    if os.path.isfile(added_list):
+        with open(added_list, "r", encoding="utf-8") as f:
+            for rel_file in f.read().splitlines():
+                if rel_file:
+                    delete_existing(os.path.join(install_folder, rel_file))
+        os.remove(added_list)
+    for root, dirs, files in os.walk(rollback_dir):
+        for file in files:
+            backup = os.path.join(root, file)
+            dest_file = os.path.join(install_folder, os.path.relpath(backup, rollback_dir))
             delete_existing(dest_file)
-            shutil.copy2(src_file, dest_file)
+            os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+            os.replace(backup, dest_file)
+    delete_existing(rollback_dir)
+    print("Previous version restored.")
 
 
 def find_update_root(temp_folder):
@@ -63,8 +227,13 @@ def remove_artifact_folders(install_folder):
                 print(f"Warning: Could not remove {folder_name}: {e}")
 
 def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--rollback":
+        restore_rollback(sys.argv[2])
+        sys.exit(0)
+
     if len(sys.argv) < 3:
-        print("Usage: UpdateHelper.exe <temp_folder> <install_folder>")
+        print("Usage: UpdateHelper.exe <temp_folder> <install_folder> [ksamm_pid]")
+        print("       UpdateHelper.exe --rollback <install_folder>")
         sys.exit(1)
 
     temp_folder = sys.argv[1]
@@ -73,15 +242,22 @@ def main():
     ksam_exe_path = os.path.join(install_folder, ksam_exe_name)
 
     print("Waiting for KSAMM to close...")
-    wait_for_process_exit(ksam_exe_name)
+    if len(sys.argv) > 3 and sys.argv[3].isdigit():
+        wait_for_pid_exit(int(sys.argv[3]))
+    else:
+        # Older KSAMM builds don't pass their PID
+        wait_for_process_exit(ksam_exe_name)
 
     print("Finding update root folder...")
     update_root = find_update_root(temp_folder)
     print(f"Update root detected: {update_root}")
 
     print("Applying update...")
-    copy_update(update_root, install_folder)
-    print("Update applied successfully.")
+    try:
+        copy_update(update_root, install_folder)
+        print("Update applied successfully.")
+    except Exception as e:
+        print(f"ERROR: Update could not be applied, previous version kept: {e}")
 
     print("Removing artifact folders if any...")
     remove_artifact_folders(install_folder)
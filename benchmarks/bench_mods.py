@@ -0,0 +1,240 @@
+"""
+Mod management benchmarks for KSAMM on synthetic Content/ trees.
+
+Every run builds a throwaway game folder with N mods whose mod.toml/ksamm.toml files have a
+BOM and CRLF line endings and whose ksamm.toml files form dependency chains, then times:
+  - rebuild_cold:    rebuild_manifest with no mod index and no manifest yet
+  - rebuild_warm:    rebuild_manifest again with nothing changed
+  - metadata:        check_for_metadata in metadata mode
+  - install:         install_mods on N small zips plus one large multi-member zip
+  - deps_download:   install_dependencies fetching missing mods from a local HTTP stub
+  - deps_cached:     the same with the archives already in the artifact cache
+
+Nothing touches the network or the real config.toml. Results are reported as ops/sec
+(mods per second) and tracemalloc peak. Compare against a saved baseline to catch regressions:
+
+Usage:
+  python benchmarks/bench_mods.py --sizes 10,500 --save-baseline bench_baseline.json
+  python benchmarks/bench_mods.py --sizes 10,500 --baseline bench_baseline.json --threshold 0.25
+"""
+import os, sys, io, json, time, shutil, zipfile, tempfile, argparse, statistics, tracemalloc
+import threading, functools, http.server
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "KSAMM"))
+import KSAModManager as ksamm
+
+BOM = "\ufeff"
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def start_stub(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def crlf(text):
+    return (BOM + text).replace("\n", "\r\n").encode("utf-8")
+
+def mod_files(name, depends_on=None, link=None):
+    mod_toml = crlf(f'name = "{name}"\nversion = "1.0.0"\nauthor = "bench"\n')
+    lines = []
+    if depends_on:
+        lines += ["[[dependencies]]", f'name = "{depends_on}"', f'link = "{link}"', ""]
+    lines += ["[metadata]", f'name = "{name}"', 'version = "1.0.0"', 'description = "Synthetic benchmark mod"', ""]
+    return mod_toml, crlf("\n".join(lines))
+
+def write_mod(content, name, depends_on=None, link=None):
+    mod_dir = os.path.join(content, name)
+    os.makedirs(mod_dir)
+    mod_toml, ksamm_toml = mod_files(name, depends_on, link)
+    with open(os.path.join(mod_dir, "mod.toml"), "wb") as f:
+        f.write(mod_toml)
+    with open(os.path.join(mod_dir, "ksamm.toml"), "wb") as f:
+        f.write(ksamm_toml)
+
+def make_root():
+    """A fresh scratch folder with KSAMM's config, index, caches and ModSetup all pointed into it."""
+    root = tempfile.mkdtemp(prefix="ksamm_bench_")
+    game = os.path.join(root, "game")
+    os.makedirs(os.path.join(game, "Content", "Core"))
+    with open(os.path.join(game, "Content", "Core", "mod.toml"), "w") as f:
+        f.write('name = "Core"\n')
+    ksamm.CONFIG_FILE = os.path.join(root, "config.toml")
+    with open(ksamm.CONFIG_FILE, "w") as f:
+        f.write('[settings]\nOfflineMode = true\n')
+    ksamm.MOD_INDEX_FILE = os.path.join(root, "mod_index.json")
+    ksamm.RELEASE_CACHE_FILE = os.path.join(root, "release_cache.json")
+    ksamm.DISCOVERY_CACHE_FILE = os.path.join(root, "discovery_cache.json")
+    ksamm.ARTIFACT_CACHE_FOLDER = os.path.join(root, "Cache", "Artifacts")
+    ksamm.MOD_SETUP_FOLDER = os.path.join(root, "ModSetup")
+    ksamm._artifact_cache = None
+    os.makedirs(ksamm.MOD_SETUP_FOLDER)
+    return root, game, os.path.join(root, "manifest.toml")
+
+def build_tree(game, count, chain):
+    content = os.path.join(game, "Content")
+    for i in range(count):
+        depends_on = f"Mod{i - 1:05d}" if i % chain else None
+        write_mod(content, f"Mod{i:05d}", depends_on, f"http://127.0.0.1/Mod{i - 1:05d}.zip")
+
+def zip_mod(zip_path, name, extra_members=0, member_size=0):
+    mod_toml, ksamm_toml = mod_files(name)
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr(f"{name}/mod.toml", mod_toml)
+        z.writestr(f"{name}/ksamm.toml", ksamm_toml)
+        block = os.urandom(member_size) if member_size else b""
+        for i in range(extra_members):
+            z.writestr(f"{name}/Assets/blob{i:04d}.bin", block, compress_type=zipfile.ZIP_STORED)
+
+# ===================== Scenarios =====================
+# Each setup(count, args) returns (run, root, server); run() is the timed part, root is deleted afterwards
+
+def setup_rebuild_cold(count, args):
+    root, game, manifest = make_root()
+    build_tree(game, count, args.chain)
+    return (lambda: ksamm.rebuild_manifest(manifest, game)), root, None
+
+def setup_rebuild_warm(count, args):
+    root, game, manifest = make_root()
+    build_tree(game, count, args.chain)
+    ksamm.rebuild_manifest(manifest, game)
+    return (lambda: ksamm.rebuild_manifest(manifest, game)), root, None
+
+def setup_metadata(count, args):
+    root, game, manifest = make_root()
+    build_tree(game, count, args.chain)
+    ksamm.rebuild_manifest(manifest, game)
+    return (lambda: ksamm.check_for_metadata(manifest, game, [], "metadata")), root, None
+
+def setup_install(count, args):
+    root, game, manifest = make_root()
+    for i in range(count):
+        zip_mod(os.path.join(ksamm.MOD_SETUP_FOLDER, f"Mod{i:05d}.zip"), f"Mod{i:05d}")
+    if args.large_mb:
+        zip_mod(os.path.join(ksamm.MOD_SETUP_FOLDER, "LargeMod.zip"), "LargeMod", args.large_mb, 1024 * 1024)
+    return (lambda: ksamm.install_mods(manifest, game, workers=args.workers)), root, None
+
+def setup_deps(count, args, warm=False):
+    root, game, manifest = make_root()
+    downloads = min(count, args.max_downloads)
+    web = os.path.join(root, "web")
+    os.makedirs(web)
+    server, base = start_stub(web)
+    content = os.path.join(game, "Content")
+    allowlist = []
+    for i in range(downloads):
+        zip_mod(os.path.join(web, f"Dep{i:05d}.zip"), f"Dep{i:05d}")
+        link = f"{base}/Dep{i:05d}.zip"
+        allowlist.append(link)
+        write_mod(content, f"Mod{i:05d}", f"Dep{i:05d}", link)
+    ksamm.rebuild_manifest(manifest, game)
+    yes = lambda question, kind=None: True
+    if warm:
+        ksamm.install_dependencies(game, manifest, allowlist, workers=args.workers, ask=yes)
+        for i in range(downloads):
+            shutil.rmtree(os.path.join(content, f"Dep{i:05d}"))
+    return (lambda: ksamm.install_dependencies(game, manifest, allowlist, workers=args.workers, ask=yes)), root, server
+
+SCENARIOS = {
+    "rebuild_cold": setup_rebuild_cold,
+    "rebuild_warm": setup_rebuild_warm,
+    "metadata": setup_metadata,
+    "install": setup_install,
+    "deps_download": setup_deps,
+    "deps_cached": functools.partial(setup_deps, warm=True),
+}
+
+def measure(name, count, args):
+    """Median wall time over args.runs fresh trees, plus tracemalloc peak from one extra traced run."""
+    samples = []
+    peak = 0
+    for attempt in range(args.runs + 1):
+        traced = attempt == args.runs
+        run, root, server = SCENARIOS[name](count, args)
+        try:
+            if traced:
+                tracemalloc.start()
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+            else:
+                samples.append(elapsed)
+        finally:
+            if traced:
+                tracemalloc.stop()
+            if server:
+                server.shutdown()
+                server.server_close()
+            shutil.rmtree(root, ignore_errors=True)
+    ops = count if not name.startswith("deps") else min(count, args.max_downloads)
+    median = statistics.median(samples)
+    return {"median_s": median, "ops_per_sec": ops / median if median else 0.0, "peak_kb": peak / 1024, "ops": ops}
+
+def compare(results, baseline, threshold):
+    """Entries slower (or hungrier) than baseline by more than threshold, as readable lines."""
+    regressions = []
+    for key, current in results.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        if current["median_s"] > old["median_s"] * (1 + threshold):
+            regressions.append(f"{key}: {old['median_s'] * 1000:.1f} ms -> {current['median_s'] * 1000:.1f} ms")
+        if old.get("peak_kb") and current["peak_kb"] > old["peak_kb"] * (1 + threshold):
+            regressions.append(f"{key}: peak {old['peak_kb']:.0f} KB -> {current['peak_kb']:.0f} KB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,500,5000", help="comma separated mod counts")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenarios to run")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--chain", type=int, default=10, help="length of each ksamm.toml dependency chain")
+    parser.add_argument("--large-mb", type=int, default=64, help="size of the large zip in the install scenario, 0 to skip")
+    parser.add_argument("--max-downloads", type=int, default=64, help="cap on mods fetched in the deps scenarios")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--baseline", help="JSON from --save-baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing, 0.25 = 25%%")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    # KSAMM's log would swamp the report
+    ksamm.ledger.stream = io.StringIO()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    names = [n for n in args.scenarios.split(",") if n]
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario '{name}', choose from {', '.join(SCENARIOS)}")
+
+    results = {}
+    for count in sizes:
+        for name in names:
+            results[f"{count}/{name}"] = stats = measure(name, count, args)
+            ksamm.ledger.stream.seek(0)
+            ksamm.ledger.stream.truncate()
+            if not args.json:
+                print(f"{count:>6} {name:<14} {stats['median_s'] * 1000:10.1f} ms  {stats['ops_per_sec']:10.1f} ops/s  peak {stats['peak_kb']:9.0f} KB")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    if args.json:
+        print(json.dumps({"results": results, "regressions": regressions}, indent=2))
+    elif args.baseline:
+        print("\n".join(["Regressions:"] + [f"  {r}" for r in regressions]) if regressions else "No regressions.")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Serial vs process pool parsing of mod.toml/ksamm.toml, to find where the pool starts paying off.
+
+For each size a fresh synthetic Content/ tree (BOM + CRLF files, dependency chains, see
+bench_mods.py) is indexed with index_mod_folders twice: once serially and once across a
+process pool with the size threshold disabled. The crossover is the smallest size where the
+pool wins; PARSE_POOL_MIN_MODS in KSAModManager.py should sit around it.
+
+Usage:
+  python benchmarks/bench_parse.py
+  python benchmarks/bench_parse.py --sizes 100,400,1600,6400 --processes 8 --runs 5
+"""
+import os, sys, json, time, shutil, argparse, statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_mods import ksamm, make_root, build_tree
+
+def parse_jobs(game):
+    content = os.path.join(game, "Content")
+    with os.scandir(content) as it:
+        return [(entry.name, entry.path, None) for entry in it if entry.is_dir()]
+
+def time_parse(count, processes, args):
+    samples = []
+    for _ in range(args.runs):
+        # A fresh tree every time, the first parse also strips BOMs and CRLFs on disk
+        root, game, _ = make_root()
+        try:
+            build_tree(game, count, args.chain)
+            jobs = parse_jobs(game)
+            start = time.perf_counter()
+            ksamm.index_mod_folders(jobs, processes=processes, min_mods=0)
+            samples.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,100,200,400,800,1600,3200")
+    parser.add_argument("--processes", type=int, default=max(2, os.cpu_count() or 1))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--chain", type=int, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    if args.processes < 2:
+        parser.error("--processes must be at least 2, one process is the serial path")
+
+    ksamm.ledger.stream = open(os.devnull, "w")
+    rows = []
+    for count in [int(s) for s in args.sizes.split(",") if s]:
+        serial = time_parse(count, 1, args)
+        pooled = time_parse(count, args.processes, args)
+        rows.append({"mods": count, "serial_s": serial, "pool_s": pooled, "speedup": serial / pooled if pooled else 0.0})
+        if not args.json:
+            print(f"{count:>6} mods   serial {serial * 1000:9.1f} ms   pool({args.processes}) {pooled * 1000:9.1f} ms   x{serial / pooled:5.2f}")
+
+    # Smallest size from which the pool wins at every larger size too, single wins can be noise
+    crossover = None
+    for row in reversed(rows):
+        if row["pool_s"] >= row["serial_s"]:
+            break
+        crossover = row["mods"]
+
+    if args.json:
+        print(json.dumps({"processes": args.processes, "crossover": crossover, "results": rows}, indent=2))
+        return
+    if crossover is None:
+        print("The process pool never beat serial parsing at these sizes.")
+    else:
+        print(f"Crossover at about {crossover} mods (PARSE_POOL_MIN_MODS is {ksamm.PARSE_POOL_MIN_MODS}).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Startup benchmark for KSAMM.
+
+Measures, for the script and (optionally) the frozen build:
+  - import:  time to import KSAModManager (script only)
+  - cold:    wall time of `--help`, i.e. interpreter/bootloader start + import + exit
+  - menu:    time to the first main menu draw, as reported by `--timings --offline`
+
+Usage:
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --exe dist/KSAModManager/KSAModManager.exe --runs 20
+"""
+import os, sys, re, json, time, shutil, tempfile, argparse, statistics, subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(REPO_DIR, "KSAMM", "KSAModManager.py")
+MENU_TIME = re.compile(r"Time to menu \(([0-9.]+)s\)")
+ANSI = re.compile(r"\x1b\[[0-9;]*m")
+
+def run(cmd, cwd, stdin=None):
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, input=stdin, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    return time.perf_counter() - start, ANSI.sub("", proc.stdout)
+
+def measure(label, base_cmd, workdir, runs, import_cmd=None):
+    results = {"import": [], "cold": [], "menu": []}
+    for _ in range(runs):
+        if import_cmd:
+            _, out = run(import_cmd, workdir)
+            results["import"].append(float(out.strip()))
+        elapsed, _ = run(base_cmd + ["--help"], workdir)
+        results["cold"].append(elapsed)
+        _, out = run(base_cmd + ["--offline", "--timings"], workdir, stdin="q\n")
+        match = MENU_TIME.search(out)
+        if match:
+            results["menu"].append(float(match.group(1)))
+    summary = {}
+    for name, samples in results.items():
+        if samples:
+            summary[name] = {"median_ms": statistics.median(samples) * 1000, "min_ms": min(samples) * 1000, "runs": len(samples)}
+    return label, summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--exe", help="path to a frozen KSAModManager.exe to measure as well")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    reports = []
+    # Run from a scratch copy so config.toml / ModSetup are created there and not in the repo
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copy2(SCRIPT, workdir)
+        script = os.path.join(workdir, "KSAModManager.py")
+        import_cmd = [sys.executable, "-c",
+                      "import sys, time; sys.path.insert(0, '.'); t = time.perf_counter(); import KSAModManager; print(time.perf_counter() - t)"]
+        reports.append(measure("script", [sys.executable, script], workdir, args.runs, import_cmd))
+
+    if args.exe:
+        exe = os.path.abspath(args.exe)
+        reports.append(measure("frozen", [exe], os.path.dirname(exe), args.runs))
+
+    if args.json:
+        print(json.dumps(dict(reports), indent=2))
+        return
+    for label, summary in reports:
+        print(f"{label}:")
+        for name, stats in summary.items():
+            print(f"  {name:<7} median {stats['median_ms']:8.1f} ms   min {stats['min_ms']:8.1f} ms   ({stats['runs']} runs)")
+
+if __name__ == "__main__":
+    main()